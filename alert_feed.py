@@ -0,0 +1,57 @@
+"""Feed en memoria de alertas nuevas para empujarlas por SSE a los dashboards."""
+
+import asyncio
+import threading
+from functools import lru_cache
+
+# Alertas pendientes por suscriptor antes de empezar a descartar
+SUBSCRIBER_QUEUE_SIZE = 100
+
+
+class AlertFeed:
+    """
+    Pub/sub entre los hilos de detección y los handlers async de la API.
+    publish() se puede llamar desde cualquier hilo: cada suscriptor tiene
+    una asyncio.Queue en su event loop y la alerta se entrega con
+    call_soon_threadsafe, sin polling ni hilos bloqueados por cliente.
+    """
+
+    def __init__(self):
+        self._subscribers = set()  # (loop, queue)
+        self._lock = threading.Lock()
+
+    def subscribe(self) -> asyncio.Queue:
+        """Se llama desde el event loop del handler; devuelve su cola."""
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers.add((asyncio.get_running_loop(), queue))
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        with self._lock:
+            self._subscribers = {(loop, q) for loop, q in self._subscribers if q is not queue}
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._subscribers)
+
+    def publish(self, alert: dict):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(_offer, queue, alert)
+            except RuntimeError:
+                # El loop ya se cerró: el suscriptor se fue sin desuscribirse
+                self.unsubscribe(queue)
+
+
+def _offer(queue: asyncio.Queue, alert: dict):
+    # Cliente lento: se descarta la alerta; al reconectar la recupera del índice
+    if not queue.full():
+        queue.put_nowait(alert)
+
+
+@lru_cache(maxsize=1)
+def get_alert_feed() -> AlertFeed:
+    return AlertFeed()
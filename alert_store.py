@@ -0,0 +1,190 @@
+"""Índice SQLite de alertas guardadas: consultas de "recientes" sin recorrer alerts/."""
+
+import os
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from typing import Optional
+
+from alert_feed import get_alert_feed
+
+ALERT_DIR = "alerts"
+
+# Fuera de alerts/ porque esa carpeta se sirve como estático. ALERT_DB_PATH
+# se lee en get_alert_store(), no al importar: alerts.py carga el .env después
+# de que api.py ya importó este módulo
+DEFAULT_ALERT_DB_PATH = "alerts.db"
+
+IMAGE_EXTENSIONS = (".jpg", ".png", ".jpeg")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS alerts (
+    id      INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts      REAL NOT NULL,
+    image   TEXT NOT NULL,
+    source  TEXT,
+    conf    REAL,
+    cls     TEXT,
+    x1      INTEGER,
+    y1      INTEGER,
+    x2      INTEGER,
+    y2      INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_alerts_source ON alerts(source, id);
+CREATE INDEX IF NOT EXISTS idx_alerts_cls ON alerts(cls, id);
+"""
+
+# Una fila por imagen. Los índices creados antes de la restricción pueden
+# tener la primera alerta dos veces (la del backfill y la real): se deja la
+# más nueva, que es la que trae fuente y metadatos
+_UNIQUE_IMAGE = """
+DELETE FROM alerts WHERE id NOT IN (SELECT MAX(id) FROM alerts GROUP BY image);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_alerts_image ON alerts(image);
+"""
+
+
+class AlertStore:
+    """
+    Tabla append-only con una fila por alerta. Los ids son crecientes, así
+    que "las más recientes" es un recorrido descendente por la clave primaria
+    (o por los índices (source, id) / (cls, id) al filtrar): O(limit), sin
+    importar cuántas imágenes haya acumuladas en disco.
+    """
+
+    def __init__(self, db_path: str = DEFAULT_ALERT_DB_PATH, alert_dir: str = ALERT_DIR):
+        self.alert_dir = alert_dir
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+            if not self._conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'idx_alerts_image'"
+            ).fetchone():
+                self._conn.executescript(_UNIQUE_IMAGE)
+        self._backfill()
+
+    def _backfill(self):
+        """Primera vez: indexa las imágenes que ya había en alerts/ (una sola pasada)."""
+        with self._lock:
+            if self._conn.execute("SELECT 1 FROM alerts LIMIT 1").fetchone():
+                return
+        if not os.path.isdir(self.alert_dir):
+            return
+
+        rows = []
+        for entry in os.scandir(self.alert_dir):
+            if entry.is_file() and entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                rows.append((entry.stat().st_mtime, entry.name))
+        rows.sort()
+
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR IGNORE INTO alerts (ts, image) VALUES (?, ?)", rows)
+        if rows:
+            print(f"[ALERTS] Índice inicial con {len(rows)} imágenes existentes")
+
+    def record(
+        self,
+        image_path: str,
+        timestamp: Optional[float] = None,
+        source: Optional[str] = None,
+        conf: Optional[float] = None,
+        cls: Optional[str] = None,
+        bbox=None,
+    ) -> int:
+        """
+        Registra una alerta ya guardada en disco y devuelve su id. Quien
+        guarda la imagen la escribe antes de llamar acá, así que si el índice
+        se abre en ese momento el backfill ya la tomó (sin metadatos): en ese
+        caso se completa esa fila en lugar de insertar otra.
+        """
+        x1, y1, x2, y2 = bbox if bbox else (None, None, None, None)
+        image = os.path.basename(image_path)
+        values = (timestamp or time.time(), source, conf, cls, x1, y1, x2, y2)
+        with self._lock, self._conn:
+            cur = self._conn.execute(
+                "INSERT OR IGNORE INTO alerts (ts, source, conf, cls, x1, y1, x2, y2, image) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                values + (image,),
+            )
+            if cur.rowcount:
+                return cur.lastrowid
+            self._conn.execute(
+                "UPDATE alerts SET ts = ?, source = ?, conf = ?, cls = ?, x1 = ?, y1 = ?, x2 = ?, y2 = ? "
+                "WHERE image = ?",
+                values + (image,),
+            )
+            return self._conn.execute("SELECT id FROM alerts WHERE image = ?", (image,)).fetchone()[0]
+
+    def recent(
+        self,
+        limit: int = 10,
+        before_id: Optional[int] = None,
+        source: Optional[str] = None,
+        cls: Optional[str] = None,
+    ) -> list:
+        """Alertas más nuevas primero; before_id pagina hacia atrás."""
+        where, params = [], []
+        if before_id is not None:
+            where.append("id < ?")
+            params.append(before_id)
+        if source is not None:
+            where.append("source = ?")
+            params.append(source)
+        if cls is not None:
+            where.append("cls = ?")
+            params.append(cls)
+
+        sql = "SELECT * FROM alerts"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY id DESC LIMIT ?"
+        params.append(limit)
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [_row_to_dict(r) for r in rows]
+
+    def since(self, after_id: int, limit: int = 100) -> list:
+        """Alertas con id > after_id en orden cronológico (para reanudar un feed)."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM alerts WHERE id > ? ORDER BY id ASC LIMIT ?", (after_id, limit)
+            ).fetchall()
+        return [_row_to_dict(r) for r in rows]
+
+    def get(self, alert_id: int) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM alerts WHERE id = ?", (alert_id,)).fetchone()
+        return _row_to_dict(row) if row else None
+
+
+def _row_to_dict(row) -> dict:
+    bbox = None
+    if row["x1"] is not None:
+        bbox = [row["x1"], row["y1"], row["x2"], row["y2"]]
+    return {
+        "id": row["id"],
+        "image": f"/alerts/{row['image']}",
+        "timestamp": row["ts"],
+        "source": row["source"],
+        "conf": row["conf"],
+        "cls": row["cls"],
+        "bbox": bbox,
+    }
+
+
+@lru_cache(maxsize=1)
+def get_alert_store() -> AlertStore:
+    """Índice compartido por el proceso (se abre al primer uso)."""
+    return AlertStore(os.getenv("ALERT_DB_PATH", DEFAULT_ALERT_DB_PATH))
+
+
+def record_alert(image_path, timestamp=None, source=None, conf=None, cls=None, bbox=None) -> int:
+    """Indexa la alerta y la empuja al feed en vivo (SSE) de los dashboards."""
+    store = get_alert_store()
+    alert_id = store.record(image_path, timestamp, source, conf, cls, bbox)
+    get_alert_feed().publish(store.get(alert_id))
+    return alert_id
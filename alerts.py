@@ -1,29 +1,234 @@
 import os
+import queue
+import threading
+import time
+from functools import lru_cache
+
 import requests
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
 
+from metrics import ALERT_SEND, get_metrics
+
 load_dotenv()
 
 TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
 TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
 
-def send_telegram_alert(message, photo_path=None):
+# Destinos de las alertas separados por coma: telegram, webhook
+ALERT_SINKS = os.getenv("ALERT_SINKS", "telegram")
+
+# URL que recibe un POST JSON por alerta (sink "webhook", útil como stand-in local)
+ALERT_WEBHOOK_URL = os.getenv("ALERT_WEBHOOK_URL")
+
+# Cola de envío: tamaño máximo y qué descartar al llenarse (oldest | newest)
+ALERT_QUEUE_SIZE = int(os.getenv("ALERT_QUEUE_SIZE", "100"))
+ALERT_DROP_POLICY = os.getenv("ALERT_DROP_POLICY", "oldest")
+
+# Timeout por request (s), reintentos y backoff base (s) → espera = base * 2^intento
+ALERT_TIMEOUT = float(os.getenv("ALERT_TIMEOUT", "10"))
+ALERT_RETRIES = int(os.getenv("ALERT_RETRIES", "3"))
+ALERT_BACKOFF = float(os.getenv("ALERT_BACKOFF", "1.0"))
+
+
+class AlertDeliveryError(Exception):
+    """Fallo al entregar una alerta; retryable indica si vale la pena reintentar."""
+
+    def __init__(self, message, retryable=True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+@lru_cache(maxsize=1)
+def get_session() -> requests.Session:
+    """Sesión HTTP compartida: reutiliza conexiones TLS entre alertas."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def send_telegram_alert(message, photo_path=None, timeout=ALERT_TIMEOUT):
     if not TELEGRAM_TOKEN or not TELEGRAM_CHAT_ID:
         raise RuntimeError("Faltan TELEGRAM_TOKEN o TELEGRAM_CHAT_ID en el entorno")
 
+    session = get_session()
     if photo_path:
         url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendPhoto"
         with open(photo_path, "rb") as img:
-            res = requests.post(
+            res = session.post(
                 url,
                 data={"chat_id": TELEGRAM_CHAT_ID, "caption": message},
                 files={"photo": img},
+                timeout=timeout,
             )
         return res.status_code
     else:
         url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendMessage"
-        res = requests.post(
+        res = session.post(
             url,
             data={"chat_id": TELEGRAM_CHAT_ID, "text": message},
+            timeout=timeout,
         )
         return res.status_code
+
+
+def _check_status(status_code, sink_name):
+    # 429 y 5xx son transitorios; el resto de 4xx no mejora reintentando
+    if status_code == 429 or status_code >= 500:
+        raise AlertDeliveryError(f"{sink_name} respondió {status_code}")
+    if status_code >= 400:
+        raise AlertDeliveryError(f"{sink_name} respondió {status_code}", retryable=False)
+
+
+class TelegramSink:
+    name = "telegram"
+
+    def send(self, alert):
+        try:
+            status = send_telegram_alert(alert["message"], alert.get("photo_path"))
+        except requests.RequestException as exc:
+            raise AlertDeliveryError(f"telegram: {exc}") from exc
+        _check_status(status, self.name)
+
+
+class WebhookSink:
+    """POST JSON con el mensaje y la ruta de la imagen a una URL arbitraria."""
+
+    name = "webhook"
+
+    def __init__(self, url):
+        self.url = url
+
+    def send(self, alert):
+        try:
+            res = get_session().post(self.url, json=alert, timeout=ALERT_TIMEOUT)
+        except requests.RequestException as exc:
+            raise AlertDeliveryError(f"webhook: {exc}") from exc
+        _check_status(res.status_code, self.name)
+
+
+class AlertDispatcher:
+    """
+    Cola acotada + hilo de envío. Los loops de detección solo encolan
+    (dispatch nunca bloquea); el hilo entrega cada alerta a todos los sinks
+    con reintentos y backoff exponencial. Si la cola se llena se descarta la
+    alerta más vieja o la nueva según drop_policy.
+    """
+
+    def __init__(
+        self,
+        sinks,
+        queue_size: int = ALERT_QUEUE_SIZE,
+        drop_policy: str = ALERT_DROP_POLICY,
+        retries: int = ALERT_RETRIES,
+        backoff: float = ALERT_BACKOFF,
+    ):
+        self.sinks = list(sinks)
+        self.drop_policy = drop_policy
+        self.retries = retries
+        self.backoff = backoff
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def dispatch(self, message, photo_path=None) -> bool:
+        """Encola una alerta. Devuelve False si hubo que descartar la nueva."""
+        alert = {"message": message, "photo_path": photo_path, "timestamp": time.time()}
+        while True:
+            try:
+                self._queue.put_nowait(alert)
+                return True
+            except queue.Full:
+                self.dropped += 1
+                get_metrics().inc("alerts_dropped")
+                if self.drop_policy == "newest":
+                    print("[ALERT] Cola llena, se descarta la alerta nueva")
+                    return False
+                try:
+                    self._queue.get_nowait()
+                    self._queue.task_done()
+                    print("[ALERT] Cola llena, se descarta la alerta más vieja")
+                except queue.Empty:
+                    pass
+
+    @property
+    def pending(self) -> int:
+        """Alertas en cola esperando envío."""
+        return self._queue.qsize()
+
+    def flush(self, timeout: float = None) -> bool:
+        """Espera a que se vacíe la cola (p.ej. antes de salir de un script)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def _deliver(self, sink, alert):
+        for attempt in range(self.retries + 1):
+            try:
+                sink.send(alert)
+                return True
+            except AlertDeliveryError as exc:
+                print(f"[ALERT] Falló {sink.name} (intento {attempt + 1}): {exc}")
+                if not exc.retryable or attempt == self.retries:
+                    return False
+            except Exception as exc:
+                print(f"[ALERT] Error inesperado en {sink.name}: {exc}")
+                return False
+            time.sleep(self.backoff * 2 ** attempt)
+        return False
+
+    def _run(self):
+        metrics = get_metrics()
+        while True:
+            alert = self._queue.get()
+            try:
+                for sink in self.sinks:
+                    started = time.perf_counter()
+                    delivered = self._deliver(sink, alert)
+                    metrics.observe(ALERT_SEND, sink.name, time.perf_counter() - started)
+                    if delivered:
+                        self.sent += 1
+                    else:
+                        self.failed += 1
+                        metrics.inc("alert_send_failures", sink=sink.name)
+            finally:
+                self._queue.task_done()
+
+
+def build_sinks(names: str = ALERT_SINKS):
+    sinks = []
+    for name in (n.strip() for n in names.split(",")):
+        if not name:
+            continue
+        if name == "telegram":
+            if not TELEGRAM_TOKEN or not TELEGRAM_CHAT_ID:
+                print("[ALERT] Sink telegram deshabilitado: faltan TELEGRAM_TOKEN o TELEGRAM_CHAT_ID")
+                continue
+            sinks.append(TelegramSink())
+        elif name == "webhook":
+            if not ALERT_WEBHOOK_URL:
+                print("[ALERT] Sink webhook deshabilitado: falta ALERT_WEBHOOK_URL")
+                continue
+            sinks.append(WebhookSink(ALERT_WEBHOOK_URL))
+        else:
+            print(f"[ALERT] Sink desconocido: {name}")
+    return sinks
+
+
+@lru_cache(maxsize=1)
+def get_dispatcher() -> AlertDispatcher:
+    """Dispatcher compartido por todo el proceso, con los sinks de ALERT_SINKS."""
+    return AlertDispatcher(build_sinks())
+
+
+def dispatch_alert(message, photo_path=None) -> bool:
+    """Encola la alerta para envío en segundo plano; no bloquea al llamador."""
+    return get_dispatcher().dispatch(message, photo_path)
@@ -1,23 +1,46 @@
-from fastapi import FastAPI, File, UploadFile, Form, Request, Query
-from fastapi.responses import JSONResponse, StreamingResponse, HTMLResponse
+from fastapi import FastAPI, Form, Header, Request, Query
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse, HTMLResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-import uuid
+import asyncio
+import json
 import os
-import cv2
 import threading
-import time
+from contextlib import asynccontextmanager
+from typing import Optional
 
-from detector.video_detector import process_video_file
 from detector.live_detector import process_rtsp_stream
-from detector.model_provider import get_model
+from detector.capture_hub import acquire_source, get_source, release_source
+from detector.mjpeg import MJPEG_MEDIA_TYPE, StreamProfile, mjpeg_part, stream_profile
+from detector.model_provider import warm_up_models, warmup_status
+from detector.source_config import load_source_config
+from detector.video_job import JobQueueFull, get_job_queue, get_video_job, submit_video_job
+from upload_stream import receive_video_upload, UploadError
+from alert_store import get_alert_store
+from alert_feed import get_alert_feed
+from stream_sessions import RTSP, VIDEO, WEBCAM, get_session_registry
+from alerts import get_dispatcher
+from metrics import get_metrics, source_label
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Los modelos se cargan y calientan en segundo plano: la API atiende desde
+    # el primer momento (UI, alertas, /metrics) y /ready pasa a 200 recién
+    # cuando el primer frame ya no va a pagar la carga. Se calienta cada
+    # imgsz configurado en SOURCE_CONFIG.
+    sizes = {settings.imgsz for settings in load_source_config().values()} | {None}
+    threading.Thread(target=warm_up_models, args=(tuple(sizes),), daemon=True).start()
+    yield
+
 
 app = FastAPI(
     title="Gun/Knife Detection API",
     description="Detección de armas en video subido, webcam o RTSP con YOLOv8. Incluye streaming MJPEG y alertas a Telegram.",
     version="1.0.0",
     contact={"name": "Gun Detection Demo"},
-    license_info={"name": "MIT"}
+    license_info={"name": "MIT"},
+    lifespan=lifespan,
 )
 templates = Jinja2Templates(directory="templates")
 
@@ -28,8 +51,9 @@ os.makedirs(ALERT_DIR, exist_ok=True)
 STATIC_DIR = "static"
 os.makedirs(STATIC_DIR, exist_ok=True)
 
-stream_stop_event = threading.Event()
-detection_stop_event = threading.Event()
+# Parámetros por visor de los streams MJPEG (se redondean a perfiles compartidos)
+STREAM_WIDTH_QUERY = Query(None, ge=64, le=3840, description="Ancho máximo del frame (se reduce manteniendo proporción)")
+STREAM_QUALITY_QUERY = Query(None, ge=10, le=100, description="Calidad JPEG (10-100)")
 
 # Servir imágenes de alertas como archivos estáticos
 app.mount("/alerts", StaticFiles(directory=ALERT_DIR), name="alerts")
@@ -52,67 +76,102 @@ async def home(request: Request):
 # -------------------------
 # DETECCIÓN POR VIDEO FILE
 # -------------------------
-def process_video_and_cleanup(path: str, cleanup_delay: int = 60):
-    """
-    Ejecuta la detección sobre un archivo y lo elimina después de un retardo,
-    para no acumular uploads en disco mientras se permite el streaming temporal.
-    """
-    try:
-        process_video_file(path)
-    finally:
-        # Dar tiempo a que el stream use el archivo, luego eliminarlo
-        time.sleep(cleanup_delay)
-        if os.path.exists(path):
-            try:
-                os.remove(path)
-                print(f"[CLEANUP] Upload eliminado: {path}")
-            except OSError:
-                pass
-
-
 @app.post(
     "/detect/video",
     summary="Subir video y procesar",
-    description="Recibe un archivo de video, lanza la detección en segundo plano y devuelve la URL de streaming anotado."
+    description=(
+        "Recibe un archivo de video (multipart, campo `file`) escribiéndolo a disco por chunks, "
+        "con tamaño máximo MAX_UPLOAD_MB y validación de extensión/Content-Type. El video entra "
+        "en una cola con VIDEO_WORKERS workers y arranca en cuanto hay UPLOAD_START_MB escritos. "
+        "Devuelve el id del job, la URL de streaming anotado y el SHA-256 del archivo; si la cola "
+        "está llena responde 429 con su profundidad. Con `?scan=fast` se analiza un frame cada "
+        "`scan_interval` segundos y frame a frame solo alrededor de los candidatos."
+    ),
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "multipart/form-data": {
+                    "schema": {
+                        "type": "object",
+                        "required": ["file"],
+                        "properties": {"file": {"type": "string", "format": "binary"}},
+                    }
+                }
+            },
+        }
+    },
 )
-async def detect_video(file: UploadFile = File(...)):
-    file_ext = file.filename.split(".")[-1]
-    saved_name = f"{uuid.uuid4()}.{file_ext}"
-    temp_name = f"{UPLOAD_DIR}/{saved_name}"
-
-    with open(temp_name, "wb") as f:
-        f.write(await file.read())
+async def detect_video(
+    request: Request,
+    scan: Optional[str] = Query(None, pattern="^(full|fast)$", description="full | fast; por defecto SCAN_MODE"),
+    scan_interval: Optional[float] = Query(None, gt=0, le=60, description="Segundos entre muestras en modo fast"),
+):
+    # Rechazar antes de recibir el body si ya no hay lugar en la cola
+    job_queue = get_job_queue()
+    if job_queue.is_full():
+        return _queue_full_response(JobQueueFull(job_queue.depth, job_queue.capacity))
+
+    jobs = []
+
+    def start_processing(upload):
+        # Encolar en cuanto hay un prefijo: las alertas salen mientras el upload sigue
+        try:
+            jobs.append(submit_video_job(
+                upload.saved_name, upload.path, upload_done=upload.done,
+                scan_mode=scan, scan_interval=scan_interval,
+            ))
+        except JobQueueFull as exc:
+            raise UploadError(429, str(exc)) from exc
 
-    # Procesar en segundo plano para ir generando alertas mientras se puede ver el stream
-    threading.Thread(target=process_video_and_cleanup, args=(temp_name,), daemon=True).start()
+    try:
+        upload = await receive_video_upload(request, UPLOAD_DIR, on_prefix=start_processing)
+    except UploadError as exc:
+        # El upload se cortó: el job que arrancó sobre el prefijo ya no sirve
+        for job in jobs:
+            job.cancel()
+        if isinstance(exc.__cause__, JobQueueFull):
+            return _queue_full_response(exc.__cause__)
+        return JSONResponse({"error": exc.detail}, status_code=exc.status_code)
 
     return JSONResponse({
-        "file": saved_name,
-        "original_filename": file.filename,
-        "stream_url": f"/stream/video?file={saved_name}",
+        "job_id": upload.saved_name,
+        "status_url": f"/jobs/{upload.saved_name}",
+        "file": upload.saved_name,
+        "original_filename": upload.original_filename,
+        "stream_url": f"/stream/video?file={upload.saved_name}",
+        "size": upload.size,
+        "sha256": upload.sha256.hexdigest(),
     })
 
 
 # -------------------------
 # STREAM DE VIDEO SUBIDO
 # -------------------------
-def generate_video_stream(path):
-    model = get_model()
-    stream_stop_event.clear()
-    cap = cv2.VideoCapture(path)
-
-    while not stream_stop_event.is_set():
-        ret, frame = cap.read()
-        if not ret:
-            break
+def _count_skipped(label: str):
+    """on_skip para el buffer: cuenta los frames que un visor lento se saltó."""
+    metrics = get_metrics()
+    return lambda skipped: metrics.inc("stream_frames_dropped", skipped, source=label)
 
-        results = model(frame, conf=0.4, iou=0.4)
-        annotated = results[0].plot()
 
-        ret, jpeg = cv2.imencode(".jpg", annotated)
-        yield b"--frame\r\nContent-Type: image/jpeg\r\n\r\n" + jpeg.tobytes() + b"\r\n"
+def generate_video_stream(job_id, profile: StreamProfile):
+    job = get_video_job(job_id)
+    if job is None:
+        return
 
-    cap.release()
+    sessions = get_session_registry()
+    session = sessions.add_viewer(VIDEO, job_id)
+    metrics = get_metrics()
+    try:
+        # Los frames vienen del job: no se vuelve a decodificar ni a inferir el
+        # archivo por visor, y cada perfil JPEG se codifica una sola vez.
+        for packet in job.stream(stop_event=session.stop_event, on_skip=_count_skipped("video")):
+            jpeg = packet.jpeg(profile)
+            if jpeg is not None:
+                metrics.inc("stream_frames", source="video")
+                yield mjpeg_part(jpeg)
+    finally:
+        sessions.remove_viewer(session)
 
 
 @app.get(
@@ -120,48 +179,184 @@ def generate_video_stream(path):
     summary="Stream de video subido anotado",
     description="Devuelve frames MJPEG del video subido, anotado con las detecciones YOLO."
 )
-def stream_video(file: str = Query(..., description="Nombre de archivo UUID generado al subir el video")):
-    path = f"{UPLOAD_DIR}/{file}"
+def stream_video(
+    file: str = Query(..., description="Nombre de archivo UUID generado al subir el video"),
+    width: Optional[int] = STREAM_WIDTH_QUERY,
+    quality: Optional[int] = STREAM_QUALITY_QUERY,
+):
     return StreamingResponse(
-        generate_video_stream(path),
-        media_type="multipart/x-mixed-replace; boundary=frame"
+        generate_video_stream(file, stream_profile(width, quality)),
+        media_type=MJPEG_MEDIA_TYPE
     )
 
 
 # -------------------------
-# ALERTAS RECIENTES (leer carpeta)
+# JOBS DE VIDEO
+# -------------------------
+def _queue_full_response(exc: JobQueueFull):
+    return JSONResponse(
+        {"error": str(exc), "queue_depth": exc.depth, "queue_size": exc.capacity},
+        status_code=429,
+        headers={"Retry-After": "10"},
+    )
+
+
+@app.get(
+    "/jobs/{job_id}",
+    summary="Estado de un job de video",
+    description="Devuelve estado, frames procesados, FPS, ETA y cantidad de alertas del job de un video subido.",
+)
+def job_status(job_id: str):
+    job = get_video_job(job_id)
+    if job is None:
+        return JSONResponse({"error": f"Job no encontrado: {job_id}"}, status_code=404)
+    return job.progress()
+
+
+@app.post(
+    "/jobs/{job_id}/cancel",
+    summary="Cancelar un job de video",
+    description="Cancela un job en cola (no llega a correr) o en ejecución (se detiene en el próximo frame).",
+)
+def cancel_job(job_id: str):
+    job = get_video_job(job_id)
+    if job is None:
+        return JSONResponse({"error": f"Job no encontrado: {job_id}"}, status_code=404)
+    job.cancel()
+    return job.progress()
+
+
+# -------------------------
+# ALERTAS RECIENTES (índice)
 # -------------------------
 @app.get(
     "/api/alerts/recent",
     summary="Últimas alertas",
-    description="Devuelve la lista de imágenes y timestamps más recientes guardadas en alerts/.",
+    description=(
+        "Devuelve las alertas más recientes desde el índice de alertas (imagen, timestamp, fuente, "
+        "confianza, clase y bbox). Pagina hacia atrás con before_id y filtra por fuente o clase."
+    ),
 )
-def recent_alerts(limit: int = Query(10, ge=1, le=50, description="Número máximo de alertas a devolver")):
-    files = [f for f in os.listdir(ALERT_DIR) if f.lower().endswith((".jpg", ".png", ".jpeg"))]
-    files.sort(key=lambda f: os.path.getmtime(os.path.join(ALERT_DIR, f)), reverse=True)
+def recent_alerts(
+    limit: int = Query(10, ge=1, le=50, description="Número máximo de alertas a devolver"),
+    before_id: Optional[int] = Query(None, description="Devuelve alertas con id menor (paginación)"),
+    source: Optional[str] = Query(None, description="Filtra por fuente (URL RTSP, 0 para webcam o archivo)"),
+    cls: Optional[str] = Query(None, description="Filtra por clase detectada"),
+):
+    return get_alert_store().recent(limit=limit, before_id=before_id, source=source, cls=cls)
+
+
+# -------------------------
+# FEED DE ALERTAS EN VIVO (SSE)
+# -------------------------
+SSE_HEARTBEAT = 15  # segundos entre comentarios keep-alive
+
 
-    result = []
-    for f in files[:limit]:
-        ts = os.path.getmtime(os.path.join(ALERT_DIR, f))
-        result.append({
-            "image": f"/alerts/{f}",
-            "timestamp": ts,
-        })
-    return result
+def _sse_event(alert: dict) -> str:
+    return f"id: {alert['id']}\nevent: alert\ndata: {json.dumps(alert)}\n\n"
+
+
+def _alert_backlog(after_id: int):
+    """Todas las alertas con id > after_id, de a páginas de since()."""
+    store = get_alert_store()
+    while True:
+        page = store.since(after_id)
+        if not page:
+            return
+        yield from page
+        after_id = page[-1]["id"]
+
+
+async def generate_alert_events(request: Request, last_event_id: Optional[int]):
+    feed = get_alert_feed()
+    # Suscribirse antes de leer el índice para no perder alertas en el medio
+    queue = feed.subscribe()
+    try:
+        yield "retry: 3000\n\n"
+        last_sent = last_event_id
+        if last_event_id is not None:
+            for alert in _alert_backlog(last_event_id):
+                last_sent = alert["id"]
+                yield _sse_event(alert)
+
+        while not await request.is_disconnected():
+            try:
+                alert = await asyncio.wait_for(queue.get(), timeout=SSE_HEARTBEAT)
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+                continue
+            if last_sent is not None and alert["id"] <= last_sent:
+                continue
+            if last_sent is not None and alert["id"] > last_sent + 1:
+                # La cola de este cliente descartó alertas (iba lento): se
+                # recuperan del índice, incluida la que acaba de llegar
+                for missed in _alert_backlog(last_sent):
+                    last_sent = missed["id"]
+                    yield _sse_event(missed)
+                continue
+            last_sent = alert["id"]
+            yield _sse_event(alert)
+    finally:
+        feed.unsubscribe(queue)
+
+
+@app.get(
+    "/api/alerts/stream",
+    summary="Feed de alertas en vivo (SSE)",
+    description=(
+        "Server-Sent Events con cada alerta nueva en cuanto se guarda. Se abre con last_event_id (la "
+        "alerta más nueva que ya tiene el cliente); al reconectar, el navegador envía Last-Event-ID, "
+        "que tiene prioridad. En ambos casos se reenvían todas las alertas posteriores."
+    ),
+)
+async def alerts_stream(
+    request: Request,
+    last_event_id: Optional[int] = Query(None, description="Reanudar después de esta alerta"),
+    last_event_id_header: Optional[str] = Header(None, alias="Last-Event-ID"),
+):
+    # Al reconectar manda el header del navegador (la última recibida); el
+    # parámetro es la alerta más nueva que el dashboard cargó antes de abrir
+    if last_event_id_header and last_event_id_header.isdigit():
+        last_event_id = int(last_event_id_header)
+    return StreamingResponse(
+        generate_alert_events(request, last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 # -------------------------
 # DETECCIÓN POR RTSP
 # -------------------------
+def _start_detection(kind, source):
+    """Lanza la detección de alertas dentro de la sesión de la fuente; None si ya corre."""
+    sessions = get_session_registry()
+    session = sessions.start_detection(kind, source)
+    if session is None:
+        return None
+
+    def run():
+        try:
+            process_rtsp_stream(source, session.stop_event)
+        finally:
+            sessions.end_detection(session)
+
+    threading.Thread(target=run, daemon=True).start()
+    return session
+
+
 @app.post(
     "/detect/rtsp",
     summary="Iniciar detección RTSP",
     description="Arranca detección en segundo plano sobre un stream RTSP y envía alertas si aplica."
 )
-def detect_rtsp(rtsp_url: str = Form(..., description="URL RTSP completa")):
-    detection_stop_event.clear()
-    threading.Thread(target=process_rtsp_stream, args=(rtsp_url, detection_stop_event), daemon=True).start()
-    return JSONResponse({"status": "streaming started", "rtsp": rtsp_url})
+def detect_rtsp(
+    rtsp_url: str = Form(..., description="URL RTSP completa"),
+):
+    session = _start_detection(RTSP, rtsp_url)
+    if session is None:
+        return JSONResponse({"error": "Ya hay una detección activa para esta fuente"}, status_code=409)
+    return JSONResponse({"status": "streaming started", "rtsp": rtsp_url, "session_id": session.id})
 
 
 # -------------------------
@@ -173,31 +368,45 @@ def detect_rtsp(rtsp_url: str = Form(..., description="URL RTSP completa")):
     description="Arranca detección en segundo plano usando la webcam local (dispositivo 0)."
 )
 def detect_webcam():
-    detection_stop_event.clear()
-    threading.Thread(target=process_rtsp_stream, args=(0, detection_stop_event), daemon=True).start()
-    return JSONResponse({"status": "webcam detection started"})
+    session = _start_detection(WEBCAM, 0)
+    if session is None:
+        return JSONResponse({"error": "Ya hay una detección activa en la webcam"}, status_code=409)
+    return JSONResponse({"status": "webcam detection started", "session_id": session.id})
 
 
 # -------------------------
 # STREAM PARA WEBCAM
 # -------------------------
-def generate_webcam_stream():
-    model = get_model()
-    stream_stop_event.clear()
-    cap = cv2.VideoCapture(0)
-
-    while not stream_stop_event.is_set():
-        ret, frame = cap.read()
-        if not ret:
-            continue
-
-        results = model(frame, conf=0.4)
-        annotated = results[0].plot()
+def _generate_source_stream(kind, source, profile: StreamProfile):
+    """
+    MJPEG a partir del lector compartido de la fuente: reutiliza la captura y
+    la inferencia que ya hace el hub en lugar de abrir la cámara otra vez.
+    Cada paquete se codifica una vez por perfil para todos los visores, y un
+    visor lento recibe siempre el frame más nuevo en lugar de acumular cola.
+    El visor cuenta en la sesión de la fuente y termina si esa sesión se detiene.
+    """
+    sessions = get_session_registry()
+    session = sessions.add_viewer(kind, source)
+    reader = acquire_source(source)
+    if reader is None:
+        sessions.remove_viewer(session)
+        return
+
+    metrics = get_metrics()
+    on_skip = _count_skipped(reader.label)
+    try:
+        for packet in reader.subscribe(stop_event=session.stop_event, latest_only=True, on_skip=on_skip):
+            jpeg = packet.jpeg(profile)
+            if jpeg is not None:
+                metrics.inc("stream_frames", source=reader.label)
+                yield mjpeg_part(jpeg)
+    finally:
+        release_source(reader)
+        sessions.remove_viewer(session)
 
-        ret, jpeg = cv2.imencode(".jpg", annotated)
-        yield b"--frame\r\nContent-Type: image/jpeg\r\n\r\n" + jpeg.tobytes() + b"\r\n"
 
-    cap.release()
+def generate_webcam_stream(profile: StreamProfile):
+    yield from _generate_source_stream(WEBCAM, 0, profile)
 
 
 @app.get(
@@ -205,33 +414,21 @@ def generate_webcam_stream():
     summary="Stream de webcam anotado",
     description="Devuelve frames MJPEG de la webcam local anotados con YOLO."
 )
-def webcam_stream():
+def webcam_stream(
+    width: Optional[int] = STREAM_WIDTH_QUERY,
+    quality: Optional[int] = STREAM_QUALITY_QUERY,
+):
     return StreamingResponse(
-        generate_webcam_stream(),
-        media_type="multipart/x-mixed-replace; boundary=frame"
+        generate_webcam_stream(stream_profile(width, quality)),
+        media_type=MJPEG_MEDIA_TYPE
     )
 
 
 # -------------------------
 # STREAM PARA RTSP
 # -------------------------
-def generate_rtsp_stream(url):
-    model = get_model()
-    stream_stop_event.clear()
-    cap = cv2.VideoCapture(url)
-
-    while not stream_stop_event.is_set():
-        ret, frame = cap.read()
-        if not ret:
-            continue
-
-        results = model(frame, conf=0.4)
-        annotated = results[0].plot()
-
-        ret, jpeg = cv2.imencode(".jpg", annotated)
-        yield b"--frame\r\nContent-Type: image/jpeg\r\n\r\n" + jpeg.tobytes() + b"\r\n"
-
-    cap.release()
+def generate_rtsp_stream(url, profile: StreamProfile):
+    yield from _generate_source_stream(RTSP, url, profile)
 
 
 @app.get(
@@ -239,22 +436,124 @@ def generate_rtsp_stream(url):
     summary="Stream RTSP anotado",
     description="Devuelve frames MJPEG anotados de un stream RTSP público o de LAN."
 )
-def rtsp_stream(url: str = Query(..., description="URL RTSP a consumir en modo lectura")):
+def rtsp_stream(
+    url: str = Query(..., description="URL RTSP a consumir en modo lectura"),
+    width: Optional[int] = STREAM_WIDTH_QUERY,
+    quality: Optional[int] = STREAM_QUALITY_QUERY,
+):
     return StreamingResponse(
-        generate_rtsp_stream(url),
-        media_type="multipart/x-mixed-replace; boundary=frame"
+        generate_rtsp_stream(url, stream_profile(width, quality)),
+        media_type=MJPEG_MEDIA_TYPE
     )
 
 
+# -------------------------
+# SESIONES
+# -------------------------
+@app.get(
+    "/sessions",
+    summary="Sesiones de stream activas",
+    description=(
+        "Lista cada fuente activa (webcam, RTSP o video subido) con su id de sesión, FPS, "
+        "latencia de inferencia, visores conectados y si tiene detección de alertas corriendo."
+    ),
+)
+def list_sessions():
+    return [session.info() for session in get_session_registry().list()]
+
+
+@app.post(
+    "/sessions/{session_id}/stop",
+    summary="Detener una sesión",
+    description="Corta los visores y la detección de esa fuente; las demás cámaras siguen corriendo.",
+)
+def stop_session(session_id: str):
+    sessions = get_session_registry()
+    session = sessions.get(session_id)
+    if session is None:
+        return JSONResponse({"error": "Sesión no encontrada"}, status_code=404)
+    sessions.stop(session)
+    return {"status": "stopped", "session_id": session_id}
+
+
 # -------------------------
 # STOP STREAM
 # -------------------------
 @app.post(
     "/stream/stop",
     summary="Detener streams y captura",
-    description="Corta el streaming MJPEG y la captura/detección en background para liberar cámara/RTSP."
+    description=(
+        "Con session_id detiene solo esa sesión (igual que /sessions/{id}/stop). Sin él corta "
+        "todas las sesiones: streams MJPEG y captura/detección en background."
+    ),
+)
+def stop_stream(session_id: Optional[str] = Form(None, description="Sesión a detener; vacío = todas")):
+    sessions = get_session_registry()
+    if session_id:
+        return stop_session(session_id)
+    return {"status": "stopped", "sessions": sessions.stop_all()}
+
+
+# -------------------------
+# MÉTRICAS
+# -------------------------
+def _collect_gauges():
+    """Valores instantáneos para /metrics: sesiones, visores, colas y FPS por cámara."""
+    samples = []
+    viewers, detecting = {}, {}
+    for session in get_session_registry().list():
+        # Los videos subidos se agrupan en una sola serie (un id por upload no escala)
+        key = (session.kind, "video" if session.kind == VIDEO else source_label(session.source))
+        viewers[key] = viewers.get(key, 0) + session.viewers
+        detecting[key] = detecting.get(key, 0) + int(session.detecting)
+        reader = get_source(session.source) if session.kind != VIDEO else None
+        if reader is not None:
+            stats = reader.stats()
+            labels = {"source": reader.label}
+            samples.append(("source_fps", "Frames publicados por segundo (media móvil)", labels, stats["fps"] or 0))
+            samples.append(("source_consumers", "Consumidores del lector compartido", labels, stats["consumers"]))
+    for (kind, source), count in viewers.items():
+        labels = {"kind": kind, "source": source}
+        samples.append(("stream_viewers", "Visores MJPEG conectados", labels, count))
+        samples.append(("detection_active", "Sesiones con detección de alertas corriendo", labels, detecting[(kind, source)]))
+    samples.append(("video_queue_depth", "Videos subidos esperando un worker", {}, get_job_queue().depth))
+    samples.append(("alert_queue_depth", "Alertas esperando envío", {}, get_dispatcher().pending))
+    samples.append(("alert_feed_subscribers", "Clientes conectados a /api/alerts/stream", {}, get_alert_feed().subscribers))
+    samples.append(("models_ready", "1 si los modelos están cargados y calentados", {}, int(warmup_status()["status"] == "ready")))
+    return samples
+
+
+get_metrics().add_collector(_collect_gauges)
+
+
+@app.get(
+    "/metrics",
+    response_class=PlainTextResponse,
+    summary="Métricas (formato Prometheus)",
+    description=(
+        "Histogramas de duración por etapa (decode, inference, annotate, encode, alert_send) y fuente, "
+        "contadores de frames, detecciones, alertas, fallos de envío y frames descartados, y gauges "
+        "de sesiones y colas. Las URLs RTSP aparecen sin usuario ni clave."
+    ),
+)
+def metrics_endpoint():
+    return PlainTextResponse(get_metrics().render(), media_type="text/plain; version=0.0.4")
+
+
+# -------------------------
+# READINESS
+# -------------------------
+@app.get(
+    "/ready",
+    summary="Readiness",
+    description=(
+        "200 cuando los modelos están cargados y calentados (backend, modelos y segundos que tardó); "
+        "503 mientras se cargan o si fallaron. Para el readiness probe en reinicios escalonados: "
+        "así ninguna instancia recibe tráfico de detección con el primer frame todavía en frío."
+    ),
 )
-def stop_stream():
-    stream_stop_event.set()
-    detection_stop_event.set()
-    return {"status": "stopped"}
+def readiness():
+    status = warmup_status()
+    if status["status"] != "ready":
+        return JSONResponse(status, status_code=503)
+    return status
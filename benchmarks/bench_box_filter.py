@@ -0,0 +1,81 @@
+"""
+Micro-benchmark del filtrado de cajas: bucle por caja (versión anterior)
+frente a detector.box_filter (NumPy, una sola transferencia).
+
+Uso:
+    python -m benchmarks.bench_box_filter --boxes 5 50 300 --repeat 2000
+"""
+
+import argparse
+import time
+
+import numpy as np
+import torch
+from ultralytics.engine.results import Boxes
+
+from detector.box_filter import filter_boxes
+
+MIN_AREA = 1500
+MIN_RATIO = 1.1
+
+
+def legacy_filter(boxes):
+    """Copia del bucle por caja que usaban los detectores (qué cajas son válidas)."""
+    valid = []
+    for box in boxes:
+        cls = int(box.cls[0])
+        if cls != 0:
+            valid.append(False)
+            continue
+
+        x1, y1, x2, y2 = map(int, box.xyxy[0])
+        w, h = x2 - x1, y2 - y1
+        area = w * h
+        ratio = w / h
+        valid.append(area >= MIN_AREA and ratio >= MIN_RATIO)
+    return valid
+
+
+def vectorized_filter(boxes):
+    return filter_boxes(boxes.data.cpu().numpy(), MIN_AREA, MIN_RATIO).tolist()
+
+
+def synthetic_boxes(n, rng, shape=(1080, 1920)):
+    h, w = shape
+    x1 = rng.uniform(0, w - 400, n)
+    y1 = rng.uniform(0, h - 300, n)
+    x2 = x1 + rng.uniform(10, 400, n)
+    y2 = y1 + rng.uniform(10, 300, n)
+    conf = rng.uniform(0.40, 0.95, n)
+    cls = rng.integers(0, 2, n)
+    data = np.stack([x1, y1, x2, y2, conf, cls], axis=1).astype(np.float32)
+    return Boxes(torch.from_numpy(data), shape)
+
+
+def bench(fn, boxes, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(boxes)
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--boxes", type=int, nargs="+", default=[5, 50, 300], help="Cajas por frame")
+    parser.add_argument("--repeat", type=int, default=2000, help="Frames simulados por caso")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'cajas':>6} {'bucle (µs)':>12} {'numpy (µs)':>12} {'speedup':>8}")
+    for n in args.boxes:
+        boxes = synthetic_boxes(n, rng)
+        legacy, fast = legacy_filter(boxes), vectorized_filter(boxes)
+        assert legacy == fast, (legacy, fast)
+
+        t_legacy = bench(legacy_filter, boxes, args.repeat)
+        t_fast = bench(vectorized_filter, boxes, args.repeat)
+        print(f"{n:>6} {t_legacy:>12.1f} {t_fast:>12.1f} {t_legacy / t_fast:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Análisis completo frente a análisis rápido (detector/fast_scan.py) sobre el
+mismo video: tiempo total, frames analizados, aceleración y qué alertas del
+análisis completo también aparecen en el rápido (mismo momento del video,
+dentro de la ventana densa).
+
+Las alertas no se indexan ni se envían, y sus imágenes van a un directorio
+temporal que se borra al terminar: no toca alerts/, alerts.db ni los sinks.
+
+Uso:
+    python -m benchmarks.bench_fast_scan video.mp4 --interval 1.0
+"""
+
+import argparse
+import shutil
+import tempfile
+import time
+
+from dotenv import load_dotenv
+
+# Antes de importar detector.*: leen SCAN_*, INFER_BACKEND, etc. al importarse
+load_dotenv()
+
+from detector import video_detector
+from detector.fast_scan import SCAN_DENSE_WINDOW, SCAN_INTERVAL
+from detector.model_provider import get_models
+
+
+def run(path, mode, interval, stride):
+    analyzed = [0]
+
+    def count(frame, boxes, names):
+        analyzed[0] += 1
+
+    start = time.perf_counter()
+    result = video_detector.process_video_file(
+        path, on_frame=count, scan_mode=mode, scan_interval=interval, scan_stride=stride, emit_alerts=False,
+    )
+    return time.perf_counter() - start, analyzed[0], result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("video")
+    parser.add_argument("--interval", type=float, default=SCAN_INTERVAL, help="Segundos entre muestras")
+    parser.add_argument("--stride", type=int, default=0, help="Frames entre muestras (gana sobre --interval)")
+    args = parser.parse_args()
+
+    get_models()  # la carga de los modelos no cuenta para ninguno de los dos modos
+
+    video_detector.ALERT_FOLDER = tempfile.mkdtemp(prefix="bench_fast_scan_")
+    try:
+        full_s, full_frames, full = run(args.video, "full", args.interval, args.stride)
+        fast_s, fast_frames, fast = run(args.video, "fast", args.interval, args.stride)
+    finally:
+        shutil.rmtree(video_detector.ALERT_FOLDER, ignore_errors=True)
+
+    print(f"{'modo':<6} {'segundos':>9} {'frames':>8} {'alertas':>8}")
+    print(f"{'full':<6} {full_s:>9.2f} {full_frames:>8} {len(full['alerts']):>8}")
+    print(f"{'fast':<6} {fast_s:>9.2f} {fast_frames:>8} {len(fast['alerts']):>8}")
+    print(f"Aceleración fast vs full: {full_s / fast_s:.2f}x")
+    print(f"Recorrido rápido: {fast['scan']}")
+
+    fast_times = [a["video_time"] for a in fast["alerts"]]
+    missed = [
+        a["video_time"] for a in full["alerts"]
+        if not any(abs(a["video_time"] - t) <= SCAN_DENSE_WINDOW for t in fast_times)
+    ]
+    if missed:
+        print(f"Alertas del análisis completo sin equivalente en el rápido (s): {missed}")
+    else:
+        print("Todas las alertas del análisis completo aparecen en el rápido")
+
+
+if __name__ == "__main__":
+    main()
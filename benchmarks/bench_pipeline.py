@@ -0,0 +1,417 @@
+"""
+Benchmark reproducible de punta a punta sobre el material incluido en el
+repo: las imágenes de models/results/*/test_images y un video sintético que
+se arma con ellas (siempre el mismo: cada imagen unos segundos con un leve
+desplazamiento, para que el filtro de movimiento y el tracker trabajen).
+
+Por backend de inferencia corre tres casos:
+    images  cv2.imread + DetectionEngine.detect (detector/engine.py) de cada imagen
+    video   process_video_file (detector/video_detector.py) con un visor MJPEG
+    live    process_rtsp_stream (detector/live_detector.py) leyendo el video
+            sintético por el hub de captura, con un visor MJPEG
+
+y reporta FPS, latencia por frame p50/p99, p50/p99 por etapa (las de
+metrics.py: decode, inference, annotate, encode), RSS pico y alertas. Cada
+caso corre en un proceso aparte para que el RSS pico sea solo suyo; las
+alertas se guardan en un directorio temporal y no se envían.
+
+El resultado queda en JSON. Con --baseline se compara contra una corrida
+anterior y sale con código 1 si algún caso perdió más de --tolerance de FPS
+o subió más de --tolerance su p99:
+
+Uso:
+    python -m benchmarks.bench_pipeline --backends torch onnx --out bench_pipeline.json
+    python -m benchmarks.bench_pipeline --baseline bench_pipeline.json --out bench_pipeline_nuevo.json
+
+En live el video se lee sin pausas, como una cámara más rápida que el
+modelo: mide lo máximo que sostiene el hub y los frames que descarta
+(frames_dropped). Por eso sus alertas varían entre corridas; las de video
+son deterministas.
+"""
+
+import argparse
+import glob
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import cv2
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_IMAGES = os.path.join(REPO_ROOT, "models", "results", "*", "test_images", "*")
+
+CASES = ("images", "video", "live")
+
+# Etapas de metrics.py que se reportan
+STAGES = ("decode", "inference", "annotate", "encode")
+
+# Variables con rutas que el proceso hijo (cwd temporal) necesita absolutas
+PATH_VARS = ("MODEL_PATH", "SOURCE_CONFIG")
+
+
+def percentile(values, q):
+    return round(float(np.percentile(values, q)) * 1000, 2) if len(values) else None
+
+
+def summarize(seconds) -> dict:
+    """Duraciones en segundos -> p50/p99 en milisegundos."""
+    return {"p50_ms": percentile(seconds, 50), "p99_ms": percentile(seconds, 99), "count": len(seconds)}
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss está en KB en Linux
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def build_sample_video(images, path, size=(1280, 720), fps=15, seconds_per_image=2.0):
+    """
+    Video MJPG con cada imagen centrada (sin deformar) durante
+    seconds_per_image, con un zoom y paneo lentos. No usa azar: dos corridas
+    generan exactamente los mismos frames.
+    """
+    width, height = size
+    per_image = max(1, round(seconds_per_image * fps))
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), fps, size)
+    total = 0
+    try:
+        for image_path in images:
+            image = cv2.imread(image_path)
+            if image is None:
+                continue
+            h, w = image.shape[:2]
+            base = min(width / w, height / h) * 0.85
+            for step in range(per_image):
+                scale = base * (1 + 0.1 * step / per_image)
+                shift = 40 * step / per_image
+                matrix = np.float32([
+                    [scale, 0, (width - w * scale) / 2 + shift],
+                    [0, scale, (height - h * scale) / 2],
+                ])
+                writer.write(cv2.warpAffine(image, matrix, size))
+                total += 1
+    finally:
+        writer.release()
+    return total
+
+
+# -----------------------------
+#     CASOS (proceso hijo)
+# -----------------------------
+
+def run_images(images, repeat) -> dict:
+    from detector.engine import DetectionEngine
+    from detector.source_config import get_source_settings
+    from detector.video_detector import ENGINE_PROFILE
+    from metrics import DECODE, INFERENCE, get_metrics
+
+    settings = get_source_settings()
+    engine = DetectionEngine(settings.engine_config(ENGINE_PROFILE), settings=settings)
+    metrics = get_metrics()
+    engine.detect(cv2.imread(images[0]))  # calentamiento
+    frame_s, detections = [], 0
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for path in images:
+            started = time.perf_counter()
+            with metrics.timed(DECODE, "images"):
+                frame = cv2.imread(path)
+            with metrics.timed(INFERENCE, "images"):
+                boxes = engine.detect(frame)
+            frame_s.append(time.perf_counter() - started)
+            detections += len(boxes)
+    return {"elapsed_s": time.perf_counter() - start, "frame_s": frame_s, "alerts": None, "detections": detections}
+
+
+def run_video(video, profile) -> dict:
+    from detector.capture_hub import FramePacket
+    from detector.model_provider import get_models
+    from detector.video_detector import process_video_file
+    from metrics import get_metrics
+
+    get_models()
+    stamps = []
+
+    def on_frame(frame, boxes, names):
+        # Un visor MJPEG conectado: anotar y codificar cada frame
+        FramePacket(frame, boxes, names, time.time(), source="video").jpeg(profile)
+        stamps.append(time.perf_counter())
+
+    start = time.perf_counter()
+    stamps.append(start)
+    result = process_video_file(video, on_frame=on_frame, emit_alerts=False)
+    return {
+        "elapsed_s": time.perf_counter() - start,
+        "frame_s": list(np.diff(stamps)),
+        "alerts": len(result["alerts"]),
+        "detections": int(get_metrics().counter("detections")),
+    }
+
+
+def run_live(video, profile, total, timeout) -> dict:
+    from detector.capture_hub import acquire_source, release_source
+    from detector.live_detector import process_rtsp_stream
+    from detector.model_provider import get_models
+    from metrics import get_metrics
+
+    get_models()
+    reader = acquire_source(video)
+    if reader is None:
+        raise RuntimeError(f"No se pudo abrir {video}")
+    stop_event = threading.Event()
+    stamps = []
+
+    def viewer():
+        for packet in reader.subscribe(stop_event=stop_event, latest_only=True):
+            packet.jpeg(profile)
+
+    def clock():
+        # Sin latest_only: ve cada paquete publicado, como process_rtsp_stream
+        for packet in reader.subscribe(stop_event=stop_event):
+            if packet.analyzed:
+                stamps.append(time.perf_counter())
+
+    start = time.perf_counter()
+    threads = [
+        threading.Thread(target=process_rtsp_stream, args=(video, stop_event), daemon=True),
+        threading.Thread(target=viewer, daemon=True),
+        threading.Thread(target=clock, daemon=True),
+    ]
+    for thread in threads:
+        thread.start()
+    try:
+        # El grabber reintenta al llegar al final del archivo: se corta al leerlo entero
+        while reader.grabber.grabbed < total and time.perf_counter() - start < timeout:
+            time.sleep(0.05)
+        # Dar tiempo a que se analice el último frame leído
+        time.sleep(0.5)
+    finally:
+        stop_event.set()
+        elapsed = time.perf_counter() - start
+        dropped = reader.dropped_frames
+        release_source(reader)
+        for thread in threads:
+            thread.join(timeout=5)
+
+    # FPS entre el primer y el último frame analizado: sin la apertura ni la espera final
+    if len(stamps) > 1:
+        elapsed = stamps[-1] - stamps[0]
+    metrics = get_metrics()
+    return {
+        "elapsed_s": elapsed,
+        "frame_s": list(np.diff(stamps)),
+        "alerts": int(metrics.counter("alerts")),
+        "detections": int(metrics.counter("detections")),
+        "frames_read": reader.grabber.grabbed,
+        "frames_dropped": dropped,
+    }
+
+
+def run_child(args):
+    """Un caso con un backend; escribe su resultado en --child-out."""
+    from detector.mjpeg import stream_profile
+    from detector.model_provider import BACKENDS, exported_path, model_specs_from_env
+    from metrics import get_metrics
+
+    get_metrics().keep_samples = True
+    missing = [
+        exported_path(spec.path, args.backend) for spec in model_specs_from_env()
+        if not os.path.exists(exported_path(spec.path, args.backend))
+    ] if BACKENDS.get(args.backend) else []
+    if missing:
+        # Sin el artefacto load_model caería a PyTorch y mediría otra cosa
+        result = {"skipped": f"Falta {', '.join(missing)} (python -m detector.export_model)"}
+    else:
+        profile = stream_profile(args.width)
+        if args.child == "images":
+            raw = run_images(args.images, args.repeat)
+            frames = len(raw["frame_s"])
+        elif args.child == "video":
+            raw = run_video(args.video, profile)
+            frames = len(raw["frame_s"])
+        else:
+            raw = run_live(args.video, profile, args.frames, args.timeout)
+            frames = len(raw["frame_s"])
+
+        frame_s = raw.pop("frame_s")
+        elapsed = raw.pop("elapsed_s")
+        metrics = get_metrics()
+        result = {
+            "frames": frames,
+            "seconds": round(elapsed, 2),
+            "fps": round(frames / elapsed, 2) if elapsed else 0.0,
+            "frame": summarize(frame_s),
+            "stages": {stage: summarize(metrics.samples(stage)) for stage in STAGES if metrics.samples(stage)},
+            "peak_rss_mb": peak_rss_mb(),
+            **raw,
+        }
+
+    with open(args.child_out, "w", encoding="utf-8") as f:
+        json.dump(result, f)
+
+
+# -----------------------------
+#     ORQUESTACIÓN (padre)
+# -----------------------------
+
+def child_env(backend: str, workdir: str) -> dict:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, (REPO_ROOT, env.get("PYTHONPATH"))))
+    env["INFER_BACKEND"] = backend
+    env["ALERT_SINKS"] = ""
+    env["ALERT_DB_PATH"] = os.path.join(workdir, "alerts.db")
+    for name in PATH_VARS:
+        if env.get(name):
+            env[name] = os.path.abspath(env[name])
+    if env.get("MODELS"):
+        env["MODELS"] = ",".join(
+            f"{name}={os.path.abspath(path)}"
+            for name, _, path in (item.partition("=") for item in env["MODELS"].split(",") if item.strip())
+        )
+    elif not env.get("MODEL_PATH"):
+        env["MODEL_PATH"] = os.path.join(REPO_ROOT, "models", "guns.pt")
+    return env
+
+
+def run_case(case, backend, args, images, video, frames, workdir) -> dict:
+    out = os.path.join(workdir, f"{backend}-{case}.json")
+    cmd = [
+        sys.executable, "-m", "benchmarks.bench_pipeline",
+        "--child", case, "--backend", backend, "--child-out", out,
+        "--video", video, "--frames", str(frames), "--repeat", str(args.repeat),
+        "--width", str(args.width), "--timeout", str(args.timeout), "--images", *images,
+    ]
+    print(f"[BENCH] {backend}/{case}...")
+    proc = subprocess.run(cmd, cwd=workdir, env=child_env(backend, workdir))
+    if proc.returncode != 0 or not os.path.exists(out):
+        return {"error": f"El proceso terminó con código {proc.returncode}"}
+    with open(out, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True
+        ).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Regresiones frente a baseline: FPS que bajó o p99 por frame que subió más de tolerance."""
+    problems = []
+    for backend, cases in results.items():
+        for case, current in cases.items():
+            before = baseline.get("results", {}).get(backend, {}).get(case)
+            if not before or "fps" not in before or "fps" not in current:
+                continue
+            if current["fps"] < before["fps"] * (1 - tolerance):
+                problems.append(f"{backend}/{case}: FPS {before['fps']} -> {current['fps']}")
+            p99_before, p99_now = before["frame"]["p99_ms"], current["frame"]["p99_ms"]
+            if p99_before and p99_now and p99_now > p99_before * (1 + tolerance):
+                problems.append(f"{backend}/{case}: p99 {p99_before} ms -> {p99_now} ms")
+    return problems
+
+
+def print_table(results: dict):
+    print(f"{'caso':<16} {'FPS':>8} {'p50 ms':>8} {'p99 ms':>8} {'RSS MB':>8} {'alertas':>8}")
+    for backend, cases in results.items():
+        for case, r in cases.items():
+            name = f"{backend}/{case}"
+            if "fps" not in r:
+                print(f"{name:<16} {r.get('skipped') or r.get('error')}")
+                continue
+            alerts = "-" if r["alerts"] is None else r["alerts"]
+            print(f"{name:<16} {r['fps']:>8} {r['frame']['p50_ms']!s:>8} {r['frame']['p99_ms']!s:>8} "
+                  f"{r['peak_rss_mb']:>8} {alerts!s:>8}")
+            for stage, s in r["stages"].items():
+                print(f"{'  ' + stage:<16} {'':>8} {s['p50_ms']!s:>8} {s['p99_ms']!s:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de punta a punta sobre el material de models/results")
+    parser.add_argument("--backends", nargs="+", default=["torch"], help="torch, onnx, openvino, torchscript")
+    parser.add_argument("--cases", nargs="+", choices=CASES, default=list(CASES))
+    parser.add_argument("--images", nargs="+", default=None, help=f"Por defecto {DEFAULT_IMAGES}")
+    parser.add_argument("--seconds-per-image", type=float, default=2.0, help="Duración de cada imagen en el video")
+    parser.add_argument("--fps", type=int, default=15, help="FPS del video sintético")
+    parser.add_argument("--repeat", type=int, default=3, help="Pasadas sobre las imágenes (caso images)")
+    parser.add_argument("--width", type=int, default=0, help="Ancho del stream MJPEG simulado (0 = original)")
+    parser.add_argument("--timeout", type=float, default=600, help="Límite del caso live (segundos)")
+    parser.add_argument("--out", default="bench_pipeline.json")
+    parser.add_argument("--baseline", help="JSON de una corrida anterior para detectar regresiones")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Pérdida relativa tolerada")
+    parser.add_argument("--keep", action="store_true", help="No borrar el directorio temporal (video y alertas)")
+    # Uso interno: un caso en el proceso hijo
+    parser.add_argument("--child", choices=CASES, help=argparse.SUPPRESS)
+    parser.add_argument("--backend", help=argparse.SUPPRESS)
+    parser.add_argument("--child-out", help=argparse.SUPPRESS)
+    parser.add_argument("--video", help=argparse.SUPPRESS)
+    parser.add_argument("--frames", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args)
+        return
+
+    images = [os.path.abspath(p) for p in args.images] if args.images else sorted(glob.glob(DEFAULT_IMAGES))
+    if not images:
+        parser.error("No se encontraron imágenes")
+
+    workdir = tempfile.mkdtemp(prefix="bench_pipeline_")
+    try:
+        video = os.path.join(workdir, "sample.avi")
+        frames = build_sample_video(images, video, fps=args.fps, seconds_per_image=args.seconds_per_image)
+        print(f"[BENCH] Video sintético: {frames} frames a {args.fps} FPS desde {len(images)} imágenes")
+
+        results = {
+            backend: {case: run_case(case, backend, args, images, video, frames, workdir) for case in args.cases}
+            for backend in args.backends
+        }
+    finally:
+        if args.keep:
+            print(f"[BENCH] Archivos en {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "created_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "images": [os.path.relpath(p, REPO_ROOT) for p in images],
+            "video_frames": frames,
+            "video_fps": args.fps,
+            "args": {k: v for k, v in vars(args).items() if k in ("repeat", "width", "seconds_per_image", "cases")},
+        },
+        "results": results,
+    }
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print_table(results)
+    print(f"[BENCH] Resultados en {args.out}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            problems = compare(results, json.load(f), args.tolerance)
+        if problems:
+            print("[BENCH] Regresiones:")
+            for problem in problems:
+                print(f"  {problem}")
+            sys.exit(1)
+        print(f"[BENCH] Sin regresiones frente a {args.baseline} (tolerancia {args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
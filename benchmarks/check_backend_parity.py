@@ -0,0 +1,100 @@
+"""
+Compara las detecciones de un backend exportado (ONNX, OpenVINO o
+TorchScript) con las de PyTorch sobre las mismas imágenes, y el tiempo de
+inferencia de ambos. Cada caja de PyTorch debe tener en el otro backend una
+caja de la misma clase con IoU >= --iou y diferencia de confianza <= --conf-tol
+(y viceversa). Sale con código 1 si alguna imagen no cumple.
+
+Uso:
+    python -m detector.export_model --backend onnx models/guns.pt
+    python -m benchmarks.check_backend_parity --backend onnx --weights models/guns.pt
+"""
+
+import argparse
+import glob
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from detector.box_filter import boxes_to_array, pairwise_iou
+from detector.model_provider import BACKENDS, load_model
+from detector.source_config import EngineConfig
+
+DEFAULT_IMAGES = "models/results/*/test_images/*"
+
+# Mismos conf/IoU de predicción que los detectores
+PREDICT = EngineConfig()
+
+
+def unmatched(ref: np.ndarray, other: np.ndarray, min_iou: float, conf_tol: float) -> int:
+    """Cajas de ref sin pareja en other (misma clase, IoU y confianza dentro de tolerancia)."""
+    if len(ref) == 0:
+        return 0
+    if len(other) == 0:
+        return len(ref)
+    iou = pairwise_iou(ref[:, :4], other[:, :4])
+    same_cls = ref[:, None, -1] == other[None, :, -1]
+    close_conf = np.abs(ref[:, None, -2] - other[None, :, -2]) <= conf_tol
+    ok = (iou >= min_iou) & same_cls & close_conf
+    return int((~ok.any(axis=1)).sum())
+
+
+def timed_predict(model, frame):
+    start = time.perf_counter()
+    results = model(frame, conf=PREDICT.conf_soft, iou=PREDICT.iou_nms, verbose=False)
+    return boxes_to_array(results), (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backend", choices=[b for b in BACKENDS if BACKENDS[b]], default="onnx")
+    parser.add_argument("--weights", default="models/guns.pt")
+    parser.add_argument("--images", default=DEFAULT_IMAGES, help="Glob de imágenes de prueba")
+    parser.add_argument("--iou", type=float, default=0.90, help="IoU mínimo entre cajas emparejadas")
+    parser.add_argument("--conf-tol", type=float, default=0.05, help="Diferencia máxima de confianza")
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(args.images))
+    if not paths:
+        sys.exit(f"No hay imágenes en {args.images}")
+
+    reference = load_model(args.weights, "torch")
+    candidate = load_model(args.weights, args.backend)
+
+    failures = 0
+    times = {"torch": [], args.backend: []}
+    print(f"{'imagen':<48} {'torch':>6} {args.backend:>12} {'sin par':>8}")
+    for path in paths:
+        frame = cv2.imread(path)
+        if frame is None:
+            continue
+        # Una pasada de calentamiento por modelo para no medir la carga perezosa
+        if not times["torch"]:
+            timed_predict(reference, frame)
+            timed_predict(candidate, frame)
+
+        ref_boxes, ref_ms = timed_predict(reference, frame)
+        cand_boxes, cand_ms = timed_predict(candidate, frame)
+        times["torch"].append(ref_ms)
+        times[args.backend].append(cand_ms)
+
+        missing = unmatched(ref_boxes, cand_boxes, args.iou, args.conf_tol)
+        extra = unmatched(cand_boxes, ref_boxes, args.iou, args.conf_tol)
+        failures += bool(missing or extra)
+        print(f"{path[-48:]:<48} {len(ref_boxes):>6} {len(cand_boxes):>12} {missing + extra:>8}")
+
+    for name, values in times.items():
+        print(f"{name:<12} {np.median(values):8.1f} ms/imagen (mediana)")
+    speedup = np.median(times["torch"]) / np.median(times[args.backend])
+    print(f"Aceleración {args.backend} vs torch: {speedup:.2f}x")
+
+    if failures:
+        print(f"[PARITY] {failures}/{len(times['torch'])} imágenes fuera de tolerancia")
+        sys.exit(1)
+    print("[PARITY] OK")
+
+
+if __name__ == "__main__":
+    main()
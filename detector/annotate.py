@@ -0,0 +1,44 @@
+"""Dibujo liviano de detecciones sobre un frame (alternativa a Results.plot())."""
+
+import cv2
+import numpy as np
+
+# Colores BGR por clase (se repiten cíclicamente)
+PALETTE = [(56, 56, 255), (151, 157, 255), (31, 112, 255), (29, 178, 255), (49, 210, 207)]
+
+
+def draw_detections(frame, boxes: np.ndarray, names=None, copy: bool = True):
+    """
+    Dibuja cajas y etiquetas "clase conf" sobre el frame. boxes es el array
+    de box_filter.boxes_to_array (x1, y1, x2, y2, [track_id,] conf, cls).
+
+    A diferencia de Results.plot() no crea un Annotator ni convierte a PIL:
+    una sola copia del frame (o ninguna con copy=False) y primitivas de cv2.
+    """
+    out = frame.copy() if copy else frame
+    if boxes is None or len(boxes) == 0:
+        return out
+
+    thickness = max(round(sum(out.shape[:2]) / 2 * 0.003), 2)
+    font_scale = thickness / 3
+    for row in boxes:
+        x1, y1, x2, y2 = (int(v) for v in row[:4])
+        conf, cls = float(row[-2]), int(row[-1])
+        color = PALETTE[cls % len(PALETTE)]
+        label = f"{names[cls] if names else cls} {conf:.2f}"
+
+        cv2.rectangle(out, (x1, y1), (x2, y2), color, thickness, cv2.LINE_AA)
+        (tw, th), _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, font_scale, max(thickness - 1, 1))
+        top = y1 - th - 3 if y1 - th - 3 >= 0 else y1 + th + 3
+        cv2.rectangle(out, (x1, y1), (x1 + tw, top), color, -1, cv2.LINE_AA)
+        cv2.putText(
+            out,
+            label,
+            (x1, y1 - 2 if top < y1 else top - 2),
+            cv2.FONT_HERSHEY_SIMPLEX,
+            font_scale,
+            (255, 255, 255),
+            max(thickness - 1, 1),
+            cv2.LINE_AA,
+        )
+    return out
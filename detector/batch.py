@@ -0,0 +1,274 @@
+"""
+Procesamiento por lotes sin UI: recorre directorios o globs de videos e
+imágenes, los procesa en paralelo (un proceso con su modelo por worker) y
+escribe las detecciones de cada archivo en JSONL o Parquet, una fila por
+frame analizado con sus tiempos de decodificación e inferencia.
+
+Es reanudable: cada archivo terminado se anota en manifest.jsonl dentro del
+directorio de salida y en la siguiente corrida se saltea si no cambió
+(misma ruta, tamaño y fecha de modificación).
+
+Uso:
+    python -m detector.batch /archivo/cctv --out resultados --workers 4
+    python -m detector.batch "grabaciones/**/*.mp4" --format parquet --no-alerts
+
+Las salidas se leen juntas con polars: pl.read_parquet("resultados/*.parquet").
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List, Optional
+
+import cv2
+import polars as pl
+
+from alerts import get_dispatcher
+from detector.chunked_video import CHUNK_WORKERS, init_worker
+from detector.engine import DetectionEngine
+from detector.model_provider import get_models
+from detector.source_config import get_source_settings
+from detector.video_detector import ENGINE_PROFILE, emit_alert, process_video_file
+from upload_stream import ALLOWED_VIDEO_EXTENSIONS
+
+IMAGE_EXTENSIONS = {"jpg", "jpeg", "png", "bmp", "webp"}
+
+MANIFEST_NAME = "manifest.jsonl"
+
+DETECTION_SCHEMA = pl.Struct({
+    "cls": pl.Utf8,
+    "conf": pl.Float64,
+    "x1": pl.Float64,
+    "y1": pl.Float64,
+    "x2": pl.Float64,
+    "y2": pl.Float64,
+})
+
+FRAME_SCHEMA = {
+    "file": pl.Utf8,
+    "frame": pl.Int64,
+    "video_time": pl.Float64,
+    "decode_ms": pl.Float64,
+    "infer_ms": pl.Float64,
+    "detections": pl.List(DETECTION_SCHEMA),
+}
+
+
+def _extension(path: str) -> str:
+    return os.path.splitext(path)[1].lower().lstrip(".")
+
+
+def collect_inputs(patterns: List[str]) -> List[str]:
+    """Videos e imágenes de los directorios (recursivo) y globs indicados, sin repetir."""
+    found = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            paths = glob.glob(os.path.join(pattern, "**", "*"), recursive=True)
+        else:
+            paths = glob.glob(pattern, recursive=True)
+        found.extend(
+            os.path.abspath(p) for p in paths
+            if os.path.isfile(p) and _extension(p) in ALLOWED_VIDEO_EXTENSIONS | IMAGE_EXTENSIONS
+        )
+    return sorted(set(found))
+
+
+def _fingerprint(path: str) -> dict:
+    stat = os.stat(path)
+    return {"file": path, "size": stat.st_size, "mtime": stat.st_mtime}
+
+
+def load_manifest(out_dir: str) -> dict:
+    """Archivos ya procesados: ruta -> entrada del manifest (la última gana)."""
+    done = {}
+    path = os.path.join(out_dir, MANIFEST_NAME)
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # línea cortada por una corrida interrumpida
+                done[entry["file"]] = entry
+    return done
+
+
+def is_done(path: str, manifest: dict) -> bool:
+    entry = manifest.get(path)
+    if entry is None or not os.path.exists(entry.get("output", "")):
+        return False
+    current = _fingerprint(path)
+    return entry["size"] == current["size"] and entry["mtime"] == current["mtime"]
+
+
+def output_path(out_dir: str, path: str, fmt: str) -> str:
+    """resultados/<nombre>-<hash de la ruta>.<fmt>: nombres repetidos en carpetas distintas no chocan."""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    digest = hashlib.sha1(path.encode("utf-8")).hexdigest()[:8]
+    return os.path.join(out_dir, f"{stem}-{digest}.{fmt}")
+
+
+def _detections(boxes, names) -> list:
+    return [
+        {"cls": names.get(int(cls), str(int(cls))), "conf": float(conf),
+         "x1": float(x1), "y1": float(y1), "x2": float(x2), "y2": float(y2)}
+        for x1, y1, x2, y2, conf, cls in boxes[:, [0, 1, 2, 3, -2, -1]].tolist()
+    ]
+
+
+def _write_rows(rows: list, dest: str, fmt: str):
+    # Se escribe con otro nombre y se renombra: un archivo a medias nunca
+    # queda con el nombre final
+    tmp = dest + ".tmp"
+    if fmt == "parquet":
+        pl.DataFrame(rows, schema=FRAME_SCHEMA).write_parquet(tmp)
+    else:
+        with open(tmp, "w", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+    os.replace(tmp, dest)
+
+
+def process_file(path: str, dest: str, fmt: str, alerts: bool, scan_mode: Optional[str]) -> dict:
+    """Procesa un archivo en el worker y escribe sus filas; devuelve el resumen y las alertas."""
+    start = time.perf_counter()
+    models = get_models()
+    names = models.names
+    rows = []
+
+    if _extension(path) in IMAGE_EXTENSIONS:
+        # Una imagen suelta no tiene racha ni estabilidad: solo detecciones
+        read_start = time.perf_counter()
+        frame = cv2.imread(path)
+        if frame is None:
+            raise ValueError(f"No se pudo leer la imagen {path}")
+        decode_ms = (time.perf_counter() - read_start) * 1000
+        settings = get_source_settings()
+        engine = DetectionEngine(settings.engine_config(ENGINE_PROFILE), settings=settings)
+        infer_start = time.perf_counter()
+        boxes = engine.detect(frame)
+        infer_ms = (time.perf_counter() - infer_start) * 1000
+        rows.append({"file": path, "frame": 0, "video_time": 0.0, "decode_ms": decode_ms,
+                     "infer_ms": infer_ms, "detections": _detections(boxes, names)})
+        result = {"alerts": []}
+    else:
+        cap = cv2.VideoCapture(path)
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        cap.release()
+
+        def on_result(index, boxes, timings):
+            rows.append({"file": path, "frame": index, "video_time": round(index / fps, 3),
+                         **timings, "detections": _detections(boxes, names)})
+
+        result = process_video_file(
+            path,
+            scan_mode=scan_mode,
+            emit_alerts=False,
+            raise_alerts=alerts,
+            on_result=on_result,
+        )
+
+    _write_rows(rows, dest, fmt)
+    return {
+        "frames": len(rows),
+        "detections": sum(len(row["detections"]) for row in rows),
+        "alerts": result["alerts"],
+        "seconds": round(time.perf_counter() - start, 2),
+    }
+
+
+def run_batch(
+    inputs: List[str],
+    out_dir: str,
+    fmt: str = "jsonl",
+    workers: int = CHUNK_WORKERS,
+    alerts: bool = True,
+    scan_mode: Optional[str] = None,
+) -> dict:
+    """
+    Procesa los archivos pendientes en un pool de procesos (spawn, como
+    detector/chunked_video.py). Las alertas se indexan y envían desde este
+    proceso al terminar cada archivo, y recién entonces se anota en el
+    manifest, así un corte a mitad de archivo lo reprocesa completo.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = load_manifest(out_dir)
+    pending = [path for path in inputs if not is_done(path, manifest)]
+    print(f"[BATCH] {len(inputs)} archivos, {len(inputs) - len(pending)} ya procesados, {len(pending)} pendientes")
+    summary = {"processed": 0, "failed": 0, "skipped": len(inputs) - len(pending), "frames": 0, "alerts": 0}
+    if not pending:
+        return summary
+
+    workers = max(1, min(workers, len(pending)))
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    manifest_path = os.path.join(out_dir, MANIFEST_NAME)
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=init_worker,
+        initargs=(threads,),
+    ) as pool, open(manifest_path, "a", encoding="utf-8") as manifest_file:
+        futures = {}
+        for path in pending:
+            dest = output_path(out_dir, path, fmt)
+            futures[pool.submit(process_file, path, dest, fmt, alerts, scan_mode)] = (path, dest)
+
+        for future in as_completed(futures):
+            path, dest = futures[future]
+            try:
+                info = future.result()
+            except Exception as exc:
+                summary["failed"] += 1
+                print(f"[BATCH] Falló {path}: {exc}")
+                continue
+            for alert in info["alerts"]:
+                emit_alert(alert, os.path.basename(path))
+            entry = {
+                **_fingerprint(path),
+                "output": dest,
+                "frames": info["frames"],
+                "detections": info["detections"],
+                "alerts": len(info["alerts"]),
+                "seconds": info["seconds"],
+            }
+            manifest_file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            manifest_file.flush()
+            summary["processed"] += 1
+            summary["frames"] += info["frames"]
+            summary["alerts"] += len(info["alerts"])
+            fps = info["frames"] / info["seconds"] if info["seconds"] else 0.0
+            print(f"[BATCH] {path}: {info['frames']} frames ({fps:.1f} FPS), "
+                  f"{info['detections']} detecciones, {len(info['alerts'])} alertas")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Detección por lotes sobre directorios o globs de videos e imágenes")
+    parser.add_argument("inputs", nargs="+", help="Directorios (recursivo) o globs")
+    parser.add_argument("--out", default="batch_results", help="Directorio de salida (filas + manifest.jsonl)")
+    parser.add_argument("--format", choices=("jsonl", "parquet"), default="jsonl")
+    parser.add_argument("--workers", type=int, default=CHUNK_WORKERS, help="Archivos procesados a la vez")
+    parser.add_argument("--scan", choices=("full", "fast"), default=None, help="Por defecto SCAN_MODE")
+    parser.add_argument("--no-alerts", action="store_true",
+                        help="Solo detecciones: sin lógica de alertas, imágenes anotadas ni envíos")
+    args = parser.parse_args()
+
+    inputs = collect_inputs(args.inputs)
+    if not inputs:
+        parser.error("No se encontraron videos ni imágenes")
+
+    start = time.perf_counter()
+    summary = run_batch(inputs, args.out, args.format, args.workers, not args.no_alerts, args.scan)
+    if not args.no_alerts:
+        # Dar tiempo a que salgan las alertas encoladas antes de terminar el proceso
+        get_dispatcher().flush(timeout=30)
+    print(f"[BATCH] {summary} en {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Filtrado vectorizado (NumPy) de las cajas de YOLO, compartido por todos los detectores."""
+
+from typing import Sequence, Union
+
+import numpy as np
+
+
+EMPTY_BOXES = np.zeros((0, 6), dtype=np.float32)
+
+
+def result_to_array(result) -> np.ndarray:
+    """
+    Copia todas las cajas de un Results a host en una sola transferencia.
+    Filas: x1, y1, x2, y2, [track_id,] conf, cls.
+    """
+    data = result.boxes.data
+    if hasattr(data, "cpu"):
+        data = data.cpu().numpy()
+    return np.asarray(data)
+
+
+def boxes_to_array(results) -> np.ndarray:
+    """Cajas del primer Results (lo que devuelve model(frame))."""
+    return result_to_array(results[0])
+
+
+def pairwise_iou(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """IoU entre todas las cajas de a (N, 4) y b (M, 4) en formato x1, y1, x2, y2."""
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-9)
+
+
+def filter_boxes(
+    data: np.ndarray,
+    min_area: float,
+    min_ratio: float,
+    target_cls: Union[int, Sequence[int], np.ndarray] = 0,
+) -> np.ndarray:
+    """
+    Máscara de las cajas de `data` que pasan, todas a la vez, las mismas
+    heurísticas que antes se evaluaban caja por caja:
+
+    1. Clase:              cls ∈ target_cls (un id o varios: las clases amenaza del ensemble)
+    2. Área mínima:        área = w*h ≥ min_area
+    3. Proporción mínima:  ratio = w/h ≥ min_ratio
+
+    Estas heurísticas eliminan:
+    - objetos demasiado pequeños,
+    - objetos cuadrados (celulares, cajas),
+    - detecciones falsas pequeñas.
+
+    Las coordenadas se truncan a enteros igual que con int(). El umbral de
+    confianza lo aplica quien llama (select_alerts, por track).
+    """
+    if data.size == 0:
+        return np.zeros(0, dtype=bool)
+
+    xyxy = data[:, :4].astype(np.int64)
+    cls = data[:, -1].astype(np.int64)
+
+    w = xyxy[:, 2] - xyxy[:, 0]
+    h = xyxy[:, 3] - xyxy[:, 1]
+    area = w * h
+
+    valid_h = h > 0
+    ratio = np.divide(w, h, out=np.zeros(len(w), dtype=np.float64), where=valid_h)
+
+    is_target = cls == target_cls if np.ndim(target_cls) == 0 else np.isin(cls, target_cls)
+    return is_target & valid_h & (area >= min_area) & (ratio >= min_ratio)
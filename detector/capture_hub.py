@@ -0,0 +1,274 @@
+"""Hub de captura: una lectura y una inferencia por cámara, compartidas por todos los consumidores."""
+
+import os
+import threading
+import time
+from concurrent.futures import CancelledError
+from typing import Optional
+
+import cv2
+
+from detector.annotate import draw_detections
+from detector.box_filter import EMPTY_BOXES
+from detector.frame_buffer import FrameRingBuffer
+from detector.frame_grabber import LatestFrameGrabber
+from detector.inference_scheduler import get_scheduler
+from detector.mjpeg import StreamProfile, encode_jpeg
+from detector.model_provider import get_models
+from detector.motion_gate import make_motion_gate
+from detector.source_config import get_source_settings
+from detector.tracker import IoUTracker
+from metrics import ANNOTATE, ENCODE, INFERENCE, get_metrics, source_label
+
+# conf_soft e iou_nms de la inferencia compartida: perfil "live" de
+# detector/source_config.py, con los cambios de la fuente en SOURCE_CONFIG
+ENGINE_PROFILE = "live"
+
+# Paquetes que se conservan por fuente para consumidores algo más lentos
+CAPTURE_BUFFER_FRAMES = int(os.getenv("CAPTURE_BUFFER", "8"))
+
+# FPS de análisis por defecto de cada fuente (0 = tan rápido como permita
+# la inferencia); analysis_fps en SOURCE_CONFIG lo cambia por cámara
+ANALYSIS_FPS = float(os.getenv("ANALYSIS_FPS", "0"))
+
+# Peso de la última muestra en las medias móviles de FPS y latencia
+STATS_SMOOTHING = 0.1
+
+
+def _ema(previous: Optional[float], sample: float) -> float:
+    return sample if previous is None else previous + STATS_SMOOTHING * (sample - previous)
+
+
+class FramePacket:
+    """
+    Frame crudo leído de una fuente junto con sus detecciones (cajas
+    fusionadas de ModelEnsemble.predict) y los nombres de clase. Si analyzed
+    es False no hubo inferencia (filtro de movimiento o DETECT_EVERY) y boxes
+    son las últimas conocidas o las propagadas por el tracker (solo sirven
+    para dibujar).
+
+    El frame anotado no se genera al leer: solo cuando alguien lo pide (una
+    alerta que se guarda o un visor suscrito) y una única vez por frame. Lo
+    mismo con el JPEG: se codifica una vez por perfil y los bytes se
+    comparten entre todos los visores que piden ese perfil. source es la
+    etiqueta de la fuente en /metrics para los tiempos de dibujo y codificación.
+    """
+
+    def __init__(self, frame, boxes, names, timestamp: float, analyzed: bool = True, source: str = ""):
+        self.frame = frame
+        self.boxes = boxes
+        self.names = names
+        self.timestamp = timestamp
+        self.analyzed = analyzed
+        self.source = source
+        self._annotated = None
+        self._jpegs = {}
+        self._lock = threading.Lock()
+
+    @property
+    def annotated(self):
+        """Frame con las cajas dibujadas; se calcula una vez y se comparte."""
+        with self._lock:
+            if self._annotated is None:
+                with get_metrics().timed(ANNOTATE, self.source):
+                    self._annotated = draw_detections(self.frame, self.boxes, self.names)
+            return self._annotated
+
+    def jpeg(self, profile: StreamProfile) -> Optional[bytes]:
+        """Frame anotado codificado con el perfil pedido (cacheado por perfil)."""
+        annotated = self.annotated
+        with self._lock:
+            if profile not in self._jpegs:
+                with get_metrics().timed(ENCODE, self.source):
+                    self._jpegs[profile] = encode_jpeg(annotated, profile)
+            return self._jpegs[profile]
+
+
+class SourceReader:
+    """
+    Dueño único de un cv2.VideoCapture: un LatestFrameGrabber vacía la cámara
+    y se queda solo con el frame más nuevo; otro hilo toma ese frame (como
+    mucho analysis_fps veces por segundo), lo pasa por el planificador de
+    inferencia (que lo agrupa con los de otras cámaras) y publica FramePacket
+    en un buffer circular. La detección de alertas y los streams MJPEG se
+    suscriben al buffer en lugar de abrir la cámara de nuevo.
+
+    Con la configuración de la fuente (source_config) se infiere solo el
+    recorte de su ROI y al imgsz elegido; las cajas vuelven en coordenadas
+    del frame completo, así que los filtros de área siguen valiendo igual.
+    """
+
+    def __init__(self, source, buffer_size: int = CAPTURE_BUFFER_FRAMES):
+        self.source = source
+        self.label = source_label(source)
+        self.settings = get_source_settings(source)
+        self.engine_config = self.settings.engine_config(ENGINE_PROFILE)
+        self.packets = FrameRingBuffer(buffer_size)
+        self.stop_event = threading.Event()
+        # De la fuente y no de quien la abre: un visor MJPEG que llega antes
+        # que la detección no debe fijarle otro ritmo
+        self.analysis_fps = ANALYSIS_FPS if self.settings.analysis_fps is None else self.settings.analysis_fps
+        self.refs = 0
+        self.grabber = None
+        self.motion_gate = make_motion_gate()
+        self.fps = None           # paquetes publicados por segundo (media móvil)
+        self.infer_ms = None      # latencia de inferencia incluida la espera del batch
+        self._last_publish = None
+        self._thread = None
+
+    def open(self) -> bool:
+        cap = cv2.VideoCapture(self.source)
+        if not cap.isOpened():
+            cap.release()
+            return False
+        self.grabber = LatestFrameGrabber(cap, self.stop_event, label=self.label).start()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return True
+
+    @property
+    def dropped_frames(self) -> int:
+        """Frames decodificados que se descartaron por llegar otro más nuevo."""
+        return self.grabber.dropped if self.grabber else 0
+
+    def stop(self):
+        self.stop_event.set()
+
+    def stats(self) -> dict:
+        """FPS, latencia de inferencia y descartes, para /sessions."""
+        return {
+            "fps": round(self.fps, 2) if self.fps else None,
+            "inference_ms": round(self.infer_ms, 1) if self.infer_ms is not None else None,
+            "dropped_frames": self.dropped_frames,
+            "consumers": self.refs,
+            "motion": self.motion_gate.stats() if self.motion_gate is not None else None,
+        }
+
+    def _publish(self, packet: FramePacket):
+        now = time.monotonic()
+        if self._last_publish is not None and now > self._last_publish:
+            self.fps = _ema(self.fps, 1.0 / (now - self._last_publish))
+        self._last_publish = now
+        self.packets.publish(packet)
+
+    def subscribe(self, stop_event: Optional[threading.Event] = None, latest_only: bool = False, on_skip=None):
+        """
+        Generador de FramePacket a partir del siguiente frame publicado. Con
+        latest_only (streams a visores) se salta a lo más nuevo en cada paso.
+        """
+        return self.packets.subscribe(
+            from_oldest=False, stop_event=stop_event, latest_only=latest_only, on_skip=on_skip
+        )
+
+    def _run(self):
+        scheduler = get_scheduler()
+        scheduler.register(self)
+        metrics = get_metrics()
+        dropped_seen = 0
+        min_interval = 1.0 / self.analysis_fps if self.analysis_fps > 0 else 0.0
+        next_slot = 0.0
+        last_boxes, names = EMPTY_BOXES, get_models().names
+        # Con detect_every > 1 solo 1 de cada N frames va a YOLO; en el resto
+        # el tracker propaga las cajas (velocidad constante) para el stream.
+        detect_every = self.settings.detect_every
+        tracker = IoUTracker() if detect_every > 1 else None
+        frame_index = 0
+        try:
+            while not self.stop_event.is_set():
+                # Respetar el FPS de análisis configurado para esta fuente
+                wait = next_slot - time.monotonic()
+                if wait > 0:
+                    self.stop_event.wait(wait)
+                    continue
+
+                frame = self.grabber.latest()
+                if frame is None:
+                    continue
+                next_slot = time.monotonic() + min_interval
+                dropped = self.grabber.dropped
+                metrics.inc("frames_dropped", dropped - dropped_seen, source=self.label)
+                dropped_seen = dropped
+
+                frame_index += 1
+                if tracker is not None and frame_index % detect_every:
+                    last_boxes = tracker.predict()
+                    self._publish(FramePacket(frame, last_boxes, names, time.time(), analyzed=False, source=self.label))
+                    continue
+
+                # Solo la región de interés de la fuente pasa por el filtro de
+                # movimiento y por YOLO; el frame completo sigue yendo al stream.
+                roi = self.settings.roi
+                region = roi.crop(frame) if roi is not None else frame
+
+                # Escena estática: se publica el frame sin pasar por YOLO
+                if self.motion_gate is not None and not self.motion_gate.should_infer(region):
+                    self._publish(FramePacket(frame, last_boxes, names, time.time(), analyzed=False, source=self.label))
+                    continue
+
+                started = time.perf_counter()
+                try:
+                    boxes = scheduler.infer(
+                        self, region, conf=self.engine_config.conf_soft, iou=self.engine_config.iou_nms,
+                        **self.settings.predict_kwargs(),
+                    )
+                except CancelledError:
+                    continue
+                if roi is not None:
+                    boxes = roi.to_frame(boxes, frame.shape)
+                elapsed = time.perf_counter() - started
+                self.infer_ms = _ema(self.infer_ms, elapsed * 1000)
+                metrics.observe(INFERENCE, self.label, elapsed)
+                metrics.inc("frames", source=self.label)
+                metrics.inc("detections", len(boxes), source=self.label)
+                if tracker is not None:
+                    tracker.update(boxes)
+                last_boxes = boxes
+                self._publish(FramePacket(frame, last_boxes, names, time.time(), source=self.label))
+        finally:
+            scheduler.unregister(self)
+            self.packets.close()
+
+
+_readers = {}
+_readers_lock = threading.Lock()
+
+
+def acquire_source(source) -> Optional[SourceReader]:
+    """
+    Devuelve el lector compartido de la fuente (URL RTSP o índice de
+    dispositivo), abriéndolo si es el primer consumidor. None si no abre.
+    FPS de análisis, detect_every, ROI e imgsz salen de SOURCE_CONFIG para
+    la fuente, sin importar quién la abra primero.
+    Cada acquire debe ir seguido de un release_source.
+    """
+    with _readers_lock:
+        reader = _readers.get(source)
+        if reader is None or reader.stop_event.is_set():
+            reader = SourceReader(source)
+            if not reader.open():
+                print(f"[HUB] No se pudo abrir fuente: {source}")
+                return None
+            _readers[source] = reader
+            print(f"[HUB] Fuente abierta: {source}")
+        reader.refs += 1
+        return reader
+
+
+def get_source(source) -> Optional[SourceReader]:
+    """Lector abierto de la fuente, sin tomar referencia (solo para consultar)."""
+    with _readers_lock:
+        return _readers.get(source)
+
+
+def release_source(reader: SourceReader):
+    """Suelta una referencia; al irse el último consumidor se libera la cámara."""
+    with _readers_lock:
+        reader.refs -= 1
+        if reader.refs > 0:
+            return
+        if _readers.get(reader.source) is reader:
+            del _readers[reader.source]
+    reader.stop()
+    print(f"[HUB] Fuente liberada: {reader.source} (frames descartados: {reader.dropped_frames})")
+    if reader.motion_gate is not None:
+        print(f"[HUB] Filtro de movimiento {reader.source}: {reader.motion_gate.stats()}")
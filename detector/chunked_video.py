@@ -0,0 +1,183 @@
+"""
+Procesamiento de videos largos (ya completos en disco) en tramos paralelos,
+cada uno en un proceso con su propio modelo, con las alertas fusionadas en
+orden como si se hubiera recorrido el archivo de una sola vez.
+
+Uso:
+    python -m detector.chunked_video grabacion1.mp4 grabacion2.mp4 --workers 4
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, NamedTuple, Optional
+
+import cv2
+from dotenv import load_dotenv
+
+# Antes de importar detector.*, que leen TRACK_*, DETECT_EVERY, SOURCE_CONFIG
+# o INFER_BACKEND al importarse. Los procesos del pool (spawn) vuelven a
+# importar este módulo para correr init_worker, así que también pasa allí
+load_dotenv()
+
+from detector.source_config import PROFILES
+from detector.video_detector import ENGINE_PROFILE, emit_alert, process_video_file
+
+# Procesos del pool (cada uno carga su copia de los modelos)
+CHUNK_WORKERS = int(os.getenv("CHUNK_WORKERS") or max(1, (os.cpu_count() or 1) // 2))
+
+# Duración de cada tramo, en segundos de video
+CHUNK_SECONDS = float(os.getenv("CHUNK_SECONDS", "120"))
+
+# Segundos previos a cada tramo que se re-analizan sin alertar para
+# reconstruir racha, estabilidad y cooldown; debe cubrir el cooldown de
+# videos (subirlo si SOURCE_CONFIG lo aumenta)
+CHUNK_OVERLAP = float(os.getenv("CHUNK_OVERLAP") or PROFILES[ENGINE_PROFILE].cooldown + 1)
+
+# Contadores de motion/scan que se suman entre tramos; el resto (modo, stride) es igual en todos
+SUMMED_STATS = ("checked", "skipped", "frames_sampled", "frames_dense", "frames_skipped", "seeks", "dense_windows")
+
+
+class VideoChunk(NamedTuple):
+    path: str
+    start: int          # primer frame que puede alertar
+    end: Optional[int]  # primer frame del tramo siguiente (None = hasta el final)
+    warmup: int         # frames previos a start que se analizan sin alertar
+
+
+def split_video(path: str, chunk_seconds: float = CHUNK_SECONDS, overlap: float = CHUNK_OVERLAP) -> List[VideoChunk]:
+    """Tramos consecutivos del video; uno solo si no se conoce la cantidad de frames."""
+    cap = cv2.VideoCapture(path)
+    # Algunos backends informan -1 si no conocen los fps
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    fps = fps if fps > 0 else 30.0
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    if total <= 0:
+        return [VideoChunk(path, 0, None, 0)]
+
+    size = max(1, round(chunk_seconds * fps))
+    warmup = round(overlap * fps)
+    return [
+        VideoChunk(path, start, min(start + size, total), warmup if start else 0)
+        for start in range(0, total, size)
+    ]
+
+
+def init_worker(threads: int):
+    # Repartir los núcleos entre procesos en vez de que cada uno use todos
+    import torch
+
+    from detector.model_provider import get_models
+
+    torch.set_num_threads(threads)
+    cv2.setNumThreads(1)
+    get_models()
+
+
+def _process_chunk(chunk: VideoChunk, scan_mode: Optional[str]) -> dict:
+    return process_video_file(
+        chunk.path,
+        start_frame=chunk.start,
+        end_frame=chunk.end,
+        warmup_frames=chunk.warmup,
+        scan_mode=scan_mode,
+        emit_alerts=False,
+    )
+
+
+def merge_results(results: List[dict]) -> dict:
+    """Une los resultados de los tramos (ya en orden) en uno como el de process_video_file."""
+    merged = {
+        "status": "ok",
+        "message": "Video procesado con bounding boxes",
+        "alerts": [alert for result in results for alert in result["alerts"]],
+    }
+    for key in ("motion", "scan"):
+        parts = [result[key] for result in results if key in result]
+        if parts:
+            stats = dict(parts[0])
+            for name in stats:
+                if name in SUMMED_STATS:
+                    stats[name] = sum(part[name] for part in parts)
+            if "skip_ratio" in stats:
+                stats["skip_ratio"] = stats["skipped"] / stats["checked"] if stats["checked"] else 0.0
+            merged[key] = stats
+    merged["chunks"] = len(results)
+    return merged
+
+
+class ChunkedVideoProcessor:
+    """
+    Pool de procesos reutilizable para varios archivos. Se usa spawn y no
+    fork: el proceso padre puede tener hilos (API, dispatcher, torch) que no
+    sobreviven a un fork. Los tramos solo guardan la imagen de cada alerta;
+    el índice y el envío los hace el padre al fusionar, en orden de video,
+    para que nada quede en la cola de envío de un worker que termina.
+    """
+
+    def __init__(self, workers: int = CHUNK_WORKERS):
+        self.workers = max(1, workers)
+        threads = max(1, (os.cpu_count() or 1) // self.workers)
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_worker,
+            initargs=(threads,),
+        )
+
+    def process(
+        self,
+        path: str,
+        scan_mode: Optional[str] = None,
+        emit_alerts: bool = True,
+        chunk_seconds: float = CHUNK_SECONDS,
+        overlap: float = CHUNK_OVERLAP,
+    ) -> dict:
+        chunks = split_video(path, chunk_seconds, overlap)
+        futures = [self._pool.submit(_process_chunk, chunk, scan_mode) for chunk in chunks]
+        result = merge_results([future.result() for future in futures])
+        if emit_alerts:
+            for alert in result["alerts"]:
+                emit_alert(alert, os.path.basename(path))
+        return result
+
+    def close(self):
+        self._pool.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def process_video_chunked(path: str, workers: int = CHUNK_WORKERS, scan_mode: Optional[str] = None) -> dict:
+    """Un archivo en tramos paralelos con un pool propio (para varios, usar ChunkedVideoProcessor)."""
+    with ChunkedVideoProcessor(workers) as processor:
+        return processor.process(path, scan_mode=scan_mode)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("videos", nargs="+")
+    parser.add_argument("--workers", type=int, default=CHUNK_WORKERS)
+    parser.add_argument("--chunk-seconds", type=float, default=CHUNK_SECONDS)
+    parser.add_argument("--scan", choices=("full", "fast"), default=None, help="Por defecto SCAN_MODE")
+    args = parser.parse_args()
+
+    with ChunkedVideoProcessor(args.workers) as processor:
+        for path in args.videos:
+            start = time.perf_counter()
+            result = processor.process(path, scan_mode=args.scan, chunk_seconds=args.chunk_seconds)
+            elapsed = time.perf_counter() - start
+            print(f"[CHUNKS] {path}: {result['chunks']} tramos, {len(result['alerts'])} alertas en {elapsed:.1f}s")
+            for alert in result["alerts"]:
+                print(json.dumps(alert, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Motor de decisión único (inferencia, seguimiento y condición de alerta) para video, live y la CLI."""
+
+from typing import List, NamedTuple, Optional
+
+import numpy as np
+
+from detector.inference_scheduler import get_scheduler
+from detector.model_provider import ModelEnsemble, get_models
+from detector.source_config import EngineConfig, SourceSettings, get_source_settings
+from detector.tracker import IoUTracker, Track, select_alerts
+
+
+class Decision(NamedTuple):
+    boxes: np.ndarray      # detecciones del frame (x1, y1, x2, y2, conf, cls global)
+    tracks: List[Track]    # tracks vistos en el frame
+    alerts: List[Track]    # los que disparan alerta ahora (ya con last_alert marcado)
+
+
+class DetectionEngine:
+    """
+    Estado de detección de una fuente: el tracker y los umbrales ya
+    resueltos. Cada punto de entrada solo decide de dónde salen los frames y
+    qué hacer con las alertas:
+
+        engine = DetectionEngine(settings.engine_config("video"), settings=settings)
+        decision = engine.process(frame, now)
+
+    process(frame) = detect(frame) + update(boxes, now). Las cámaras usan solo
+    update(), porque la inferencia la hace el hub una vez para todos los
+    consumidores de la fuente. now es el reloj del cooldown: time.time() en
+    cámaras, segundos de video en archivos; con now=None solo se sigue a los
+    objetos (warmup de tramos, --no-alerts).
+
+    La condición de alerta por track es:
+
+    1) su caja pasa los filtros de clase, área y proporción
+    2) conf ≥ umbral de su modelo (hard hit)
+    3) streak ≥ streak_required (frames analizados seguidos en que apareció)
+    4) stable_hits ≥ stable_required (de esos, en cuántos la caja coincidió
+       con la posición prevista, IoU ≥ TRACK_STABLE_IOU)
+    5) cooldown cumplido para ese track → (now - last_alert) > cooldown
+
+    Esta combinación reduce falsos positivos de YOLO que aparecen un frame y
+    desaparecen, y con dos personas en cuadro cada una lleva su propio conteo.
+    """
+
+    __slots__ = ("config", "models", "scheduler", "settings", "tracker", "conf_hard", "threat_classes")
+
+    def __init__(
+        self,
+        config: EngineConfig,
+        models: Optional[ModelEnsemble] = None,
+        settings: Optional[SourceSettings] = None,
+    ):
+        self.config = config
+        # Los modelos compartidos (get_models) solo se usan desde el hilo del
+        # planificador; un ensemble propio (local_testing --model) es de este
+        # motor y se llama directo
+        self.scheduler = None if models is not None else get_scheduler()
+        self.models = models or get_models()
+        self.settings = settings or get_source_settings()
+        self.tracker = IoUTracker()
+        # Clases amenaza de todos los modelos cargados y su umbral de alerta
+        self.conf_hard = self.models.conf_hard(config.conf_hard)
+        self.threat_classes = self.models.threat_classes
+
+    @property
+    def names(self) -> dict:
+        return self.models.names
+
+    def detect(self, frame) -> np.ndarray:
+        """
+        Corre los modelos sobre el frame (solo el recorte de la ROI de la
+        fuente, al imgsz configurado) y devuelve las cajas en coordenadas del
+        frame completo, así los filtros de área siguen valiendo igual.
+        Con los modelos compartidos pasa por el planificador de inferencia,
+        que puede agruparlo en un batch con cámaras u otros videos.
+        """
+        roi = self.settings.roi
+        region = roi.crop(frame) if roi is not None else frame
+        kwargs = {"conf": self.config.conf_soft, "iou": self.config.iou_nms, **self.settings.predict_kwargs()}
+        if self.scheduler is not None:
+            boxes = self.scheduler.infer(self, region, **kwargs)
+        else:
+            boxes = self.models.predict([region], **kwargs)[0]
+        if roi is not None:
+            boxes = roi.to_frame(boxes, frame.shape)
+        return boxes
+
+    def update(self, boxes: np.ndarray, now: Optional[float] = None) -> Decision:
+        """Asocia las cajas a los tracks y, si hay reloj, elige los que alertan."""
+        tracks = self.tracker.update(boxes)
+        if now is None:
+            return Decision(boxes, tracks, [])
+        config = self.config
+        self.tracker.expire_alerts(now, config.cooldown)
+        fired = select_alerts(
+            tracks, config.min_area, config.min_ratio, self.conf_hard, self.threat_classes,
+            config.streak_required, config.stable_required, config.cooldown, now,
+        )
+        return Decision(boxes, tracks, fired)
+
+    def process(self, frame, now: Optional[float] = None) -> Decision:
+        return self.update(self.detect(frame), now)
+
+    def propagate(self) -> np.ndarray:
+        """Cajas de un frame sin inferencia (detect_every > 1), avanzadas por el tracker."""
+        return self.tracker.predict()
+
+    def is_candidate(self, boxes: np.ndarray) -> bool:
+        """Alguna caja de clase amenaza, sin filtros (muestras del análisis rápido)."""
+        return bool(len(boxes)) and bool(np.isin(boxes[:, -1], self.threat_classes).any())
+
+    def reset(self):
+        """Olvida los tracks (p.ej. al saltar a otra parte del video)."""
+        self.tracker = IoUTracker()
@@ -0,0 +1,30 @@
+"""
+Exporta los pesos .pt a un formato optimizado para CPU (ONNX, OpenVINO o
+TorchScript). El artefacto queda junto al .pt y se usa con INFER_BACKEND.
+
+Uso:
+    python -m detector.export_model --backend onnx
+    python -m detector.export_model --backend openvino models/guns.pt --imgsz 640
+"""
+
+import argparse
+
+from detector.model_provider import BACKENDS, INFER_IMGSZ, export_model
+
+DEFAULT_WEIGHTS = ["models/guns.pt", "models/knifes.pt"]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("weights", nargs="*", default=DEFAULT_WEIGHTS, help="Pesos .pt a exportar")
+    parser.add_argument("--backend", choices=[b for b in BACKENDS if BACKENDS[b]], default="onnx")
+    parser.add_argument("--imgsz", type=int, default=INFER_IMGSZ)
+    args = parser.parse_args()
+
+    for weights in args.weights:
+        path = export_model(weights, args.backend, args.imgsz)
+        print(f"[EXPORT] {weights} -> {path}")
+
+
+if __name__ == "__main__":
+    main()
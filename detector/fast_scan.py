@@ -0,0 +1,148 @@
+"""Análisis rápido de videos subidos: muestreo espaciado y análisis denso alrededor de los candidatos."""
+
+import os
+from typing import Optional
+
+import cv2
+
+# Modo de análisis de videos subidos: full (todos los frames) o fast
+SCAN_MODE = os.getenv("SCAN_MODE", "full").lower()
+
+# fast: un frame cada SCAN_INTERVAL segundos de video, o cada SCAN_STRIDE frames si es > 0
+SCAN_INTERVAL = float(os.getenv("SCAN_INTERVAL", "1.0"))
+SCAN_STRIDE = int(os.getenv("SCAN_STRIDE", "0"))
+
+# Segundos de video que se analizan frame a frame antes y después de un candidato
+SCAN_DENSE_WINDOW = float(os.getenv("SCAN_DENSE_WINDOW", "2.0"))
+
+# Saltos de más de N frames se hacen con seek; los cortos con grab() (sin retrieve)
+SCAN_SEEK_FRAMES = int(os.getenv("SCAN_SEEK_FRAMES", "90"))
+
+SCAN_MODES = ("full", "fast")
+
+# FPS supuestos cuando el contenedor no los informa
+DEFAULT_FPS = 30.0
+
+
+class FastScan:
+    """
+    Recorre el video a saltos de `stride` frames. Los frames muestreados solo
+    buscan candidatos (alguna caja de clase amenaza); no alimentan al tracker
+    ni disparan alertas, porque entre dos muestras el objeto puede haberse
+    movido demasiado para asociarlo. Cuando una muestra tiene un candidato se
+    vuelve `window` frames atrás y se analiza todo hasta `window` frames
+    después del último candidato visto; ahí corre la lógica de alertas normal.
+
+    Las posiciones son índices de frame (lo mismo que CAP_PROP_POS_FRAMES),
+    igual que al reabrir un upload que sigue creciendo.
+    """
+
+    def __init__(
+        self,
+        fps: float,
+        interval: float = SCAN_INTERVAL,
+        stride: int = SCAN_STRIDE,
+        dense_window: float = SCAN_DENSE_WINDOW,
+        seek_frames: int = SCAN_SEEK_FRAMES,
+    ):
+        self.interval = interval
+        self.fixed_stride = stride
+        self.dense_window = dense_window
+        self.set_fps(fps)
+        self.seek_frames = seek_frames
+        self.dense_until = 0   # frames con índice menor se analizan todos
+        self.dense_done = 0    # siguiente al último frame analizado en denso
+        self.sampled = 0
+        self.dense = 0
+        self.skipped = 0
+        self.seeks = 0
+        self.windows = 0
+
+    def set_fps(self, fps: float):
+        """
+        Recalcula stride y ventana. Un upload que todavía crece puede abrirse
+        sin el índice del contenedor (MP4 sin moov) y reportar un fps falso;
+        al reabrirlo completo se corrige con el real.
+        """
+        self.fps = fps if fps > 0 else DEFAULT_FPS
+        self.stride = self.fixed_stride if self.fixed_stride > 0 else max(1, round(self.interval * self.fps))
+        self.window = max(1, round(self.dense_window * self.fps))
+
+    def is_dense(self, index: int) -> bool:
+        return index < self.dense_until
+
+    def next_index(self, position: int) -> int:
+        """Próximo frame a leer estando en `position`: el siguiente en denso, o la próxima muestra."""
+        if self.is_dense(position):
+            return position
+        return -(-position // self.stride) * self.stride
+
+    def seek(self, cap, position: int, target: int) -> int:
+        """
+        Deja la captura en `target` y devuelve la nueva posición. Hacia
+        adelante y cerca, grab() descarta frames sin convertirlos; lejos o
+        hacia atrás se busca directamente. Si grab() se queda sin frames se
+        devuelve hasta dónde llegó (el lector decide si esperar o terminar).
+        """
+        if target == position:
+            return position
+        if target < position or target - position > self.seek_frames:
+            self.seeks += 1
+            if target > position:
+                self.skipped += target - position
+            cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+            return target
+        while position < target:
+            if not cap.grab():
+                break
+            position += 1
+            self.skipped += 1
+        return position
+
+    def observe(self, index: int, candidate: bool) -> Optional[int]:
+        """
+        Registra el frame analizado `index`. Si es una muestra con candidato
+        abre una ventana densa y devuelve el frame desde el que hay que
+        volver a leer (nunca antes de lo ya analizado en denso).
+        """
+        dense = self.is_dense(index)
+        if dense:
+            self.dense += 1
+            self.dense_done = index + 1
+        else:
+            self.sampled += 1
+        if not candidate:
+            return None
+
+        self.dense_until = max(self.dense_until, index + 1 + self.window)
+        if dense:
+            return None
+        self.windows += 1
+        return min(max(index - self.window, self.dense_done), index)
+
+    def stats(self) -> dict:
+        return {
+            "mode": "fast",
+            "stride": self.stride,
+            "frames_sampled": self.sampled,
+            "frames_dense": self.dense,
+            "frames_skipped": self.skipped,
+            "seeks": self.seeks,
+            "dense_windows": self.windows,
+        }
+
+
+def make_fast_scan(
+    cap,
+    mode: Optional[str] = None,
+    interval: Optional[float] = None,
+    stride: Optional[int] = None,
+) -> Optional[FastScan]:
+    """FastScan para la captura si el modo (por defecto SCAN_MODE) es "fast"; si no, None."""
+    if (mode or SCAN_MODE) != "fast":
+        return None
+    return FastScan(
+        cap.get(cv2.CAP_PROP_FPS),
+        interval=SCAN_INTERVAL if interval is None else interval,
+        stride=SCAN_STRIDE if stride is None else stride,
+    )
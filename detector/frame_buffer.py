@@ -0,0 +1,96 @@
+"""Buffer circular para repartir frames ya procesados entre varios consumidores."""
+
+import threading
+from collections import deque
+from typing import Callable, Optional
+
+
+class FrameRingBuffer:
+    """
+    Guarda los últimos `capacity` elementos publicados junto a un número de
+    secuencia creciente. Cada suscriptor lleva su propia posición: si se queda
+    atrás salta al elemento más antiguo que siga en el buffer, de modo que el
+    productor nunca se bloquea por un cliente lento y los que llegan tarde
+    pueden engancharse a lo más reciente.
+    """
+
+    def __init__(self, capacity: int = 64):
+        self._items = deque(maxlen=capacity)  # (seq, item)
+        self._next_seq = 0
+        self._closed = False
+        self._subscribers = 0
+        self._cond = threading.Condition()
+
+    def publish(self, item):
+        with self._cond:
+            self._items.append((self._next_seq, item))
+            self._next_seq += 1
+            self._cond.notify_all()
+
+    def close(self):
+        """Marca el fin del stream: los suscriptores terminan al vaciar el buffer."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    @property
+    def subscribers(self) -> int:
+        """Suscriptores activos; permite al productor saltarse trabajo si no hay nadie."""
+        return self._subscribers
+
+    def subscribe(
+        self,
+        from_oldest: bool = True,
+        stop_event: Optional[threading.Event] = None,
+        poll: float = 0.5,
+        latest_only: bool = False,
+        on_skip: Optional[Callable[[int], None]] = None,
+    ):
+        """
+        Generador que devuelve los elementos en orden. Con from_oldest=True
+        empieza por el más antiguo disponible; si no, espera al siguiente.
+        Con latest_only cada paso devuelve el más nuevo y descarta los
+        intermedios: un consumidor lento (p. ej. un visor con poco ancho de
+        banda) pierde frames en lugar de acumular retraso.
+        Termina cuando el buffer se cierra y se agotó, o cuando stop_event se activa.
+        on_skip recibe cuántos elementos se saltaron en cada paso (métricas).
+        """
+        with self._cond:
+            if from_oldest and self._items:
+                seq = self._items[0][0]
+            else:
+                seq = self._next_seq
+            self._subscribers += 1
+
+        try:
+            while True:
+                with self._cond:
+                    while seq >= self._next_seq and not self._closed:
+                        if stop_event is not None and stop_event.is_set():
+                            return
+                        self._cond.wait(poll)
+
+                    if seq >= self._next_seq:
+                        return  # cerrado y sin elementos pendientes
+
+                    oldest = self._items[0][0]
+                    target = self._next_seq - 1 if latest_only else max(seq, oldest)
+                    skipped = target - seq
+                    seq = target
+                    item = self._items[seq - oldest][1]
+
+                if skipped > 0 and on_skip is not None:
+                    on_skip(skipped)
+
+                if stop_event is not None and stop_event.is_set():
+                    return
+
+                seq += 1
+                yield item
+        finally:
+            with self._cond:
+                self._subscribers -= 1
@@ -0,0 +1,74 @@
+"""Lector de cámara que conserva solo el frame más reciente (latest-frame-wins)."""
+
+import threading
+import time
+from typing import Optional
+
+import cv2
+
+from metrics import DECODE, get_metrics
+
+
+class LatestFrameGrabber:
+    """
+    Hilo que vacía continuamente el cv2.VideoCapture y guarda únicamente el
+    último frame decodificado. Así el buffer interno de OpenCV no se llena
+    cuando YOLO va más lento que la cámara, y quien analiza siempre toma el
+    frame más fresco. Los frames que se sobrescriben sin haber sido leídos se
+    cuentan en `dropped`. Con label, cada lectura se mide en /metrics.
+    """
+
+    def __init__(self, cap: cv2.VideoCapture, stop_event: threading.Event, label: Optional[str] = None):
+        self._cap = cap
+        self._stop_event = stop_event
+        self._label = label
+        self._frame = None
+        self._seq = 0
+        self._consumed_seq = 0
+        self._cond = threading.Condition()
+        self.grabbed = 0
+        self.dropped = 0
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        # Pedir a OpenCV el buffer más chico posible (no todos los backends lo respetan)
+        self._cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        metrics = get_metrics()
+        try:
+            while not self._stop_event.is_set():
+                started = time.perf_counter()
+                ret, frame = self._cap.read()
+                if ret and self._label:
+                    metrics.observe(DECODE, self._label, time.perf_counter() - started)
+                if not ret:
+                    time.sleep(0.5)
+                    continue
+
+                with self._cond:
+                    if self._seq > self._consumed_seq:
+                        self.dropped += 1
+                    self._frame = frame
+                    self._seq += 1
+                    self.grabbed += 1
+                    self._cond.notify_all()
+        finally:
+            self._cap.release()
+            with self._cond:
+                self._cond.notify_all()
+
+    def latest(self, timeout: float = 0.5) -> Optional[object]:
+        """
+        Devuelve el frame más nuevo que aún no se entregó, esperando hasta
+        timeout segundos. None si no llegó nada nuevo o si se detuvo.
+        """
+        with self._cond:
+            if self._seq == self._consumed_seq and not self._stop_event.is_set():
+                self._cond.wait(timeout)
+            if self._seq == self._consumed_seq:
+                return None
+            self._consumed_seq = self._seq
+            return self._frame
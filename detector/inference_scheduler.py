@@ -0,0 +1,140 @@
+"""Planificador central de inferencia: agrupa frames de varias cámaras en un solo batch."""
+
+import os
+import threading
+import time
+from concurrent.futures import Future
+from functools import lru_cache
+
+from detector.model_provider import get_models
+
+# Máximo de frames por forward pass
+MAX_BATCH = int(os.getenv("INFER_MAX_BATCH", "8"))
+
+# Espera máxima (ms) para completar un batch antes de lanzarlo
+MAX_WAIT_MS = float(os.getenv("INFER_MAX_WAIT_MS", "10"))
+
+# Hilos intra-op de torch; vacío = valor por defecto de torch
+INFER_THREADS = os.getenv("INFER_THREADS")
+
+
+class InferenceScheduler:
+    """
+    Un único hilo es dueño de los modelos compartidos (get_models): cámaras,
+    videos (DetectionEngine.detect), lotes y el calentamiento de la API le
+    entregan frames con submit() y reciben un Future; el hilo junta hasta
+    max_batch frames (o espera como mucho max_wait_ms) y hace una sola pasada
+    de cada modelo del ensemble para todos. Nadie más llama a predict sobre
+    esos modelos: Ultralytics no es seguro con varios hilos a la vez.
+
+    Si un stream entrega un frame nuevo antes de que el anterior se procese,
+    el viejo se descarta (gana el más reciente) y su Future se cancela.
+
+    Si los modelos no cargan (pesos o exportación faltantes), el error se
+    entrega en todos los Futures pendientes y en los que se pidan después,
+    en vez de dejar a quien espera bloqueado para siempre.
+    """
+
+    def __init__(self, max_batch: int = MAX_BATCH, max_wait_ms: float = MAX_WAIT_MS):
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait_ms / 1000.0
+        self._pending = {}     # key -> (frame, predict_kwargs, Future), en orden de llegada
+        self._active = set()   # streams registrados; si todos entregaron, no se espera más
+        self._cond = threading.Condition()
+        self._error = None     # excepción de la carga de modelos, si falló
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def register(self, key):
+        with self._cond:
+            self._active.add(key)
+
+    def unregister(self, key):
+        with self._cond:
+            self._active.discard(key)
+            item = self._pending.pop(key, None)
+            self._cond.notify_all()
+        if item:
+            item[2].cancel()
+
+    def submit(self, key, frame, **predict_kwargs) -> Future:
+        future = Future()
+        with self._cond:
+            if self._error is not None:
+                future.set_exception(self._error)
+                return future
+            old = self._pending.pop(key, None)
+            self._pending[key] = (frame, predict_kwargs, future)
+            self._cond.notify_all()
+        if old:
+            old[2].cancel()
+        return future
+
+    def infer(self, key, frame, **predict_kwargs):
+        """Versión bloqueante de submit(): devuelve el array de cajas fusionadas del frame."""
+        return self.submit(key, frame, **predict_kwargs).result()
+
+    def _next_batch(self):
+        with self._cond:
+            while not self._pending:
+                self._cond.wait()
+
+            deadline = time.monotonic() + self.max_wait
+            while len(self._pending) < min(self.max_batch, max(len(self._active), 1)):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            # Solo se agrupan frames con los mismos parámetros de predicción
+            first_kwargs = next(iter(self._pending.values()))[1]
+            batch = []
+            for key, (frame, kwargs, future) in list(self._pending.items()):
+                if kwargs != first_kwargs:
+                    continue
+                del self._pending[key]
+                batch.append((frame, future))
+                if len(batch) >= self.max_batch:
+                    break
+            return batch, first_kwargs
+
+    def _run(self):
+        if INFER_THREADS:
+            import torch
+            torch.set_num_threads(int(INFER_THREADS))
+
+        try:
+            models = get_models()
+        except Exception as exc:
+            print(f"[SCHED] No se pudieron cargar los modelos: {exc}")
+            with self._cond:
+                self._error = exc
+                pending = list(self._pending.values())
+                self._pending.clear()
+            for _, _, future in pending:
+                if future.set_running_or_notify_cancel():
+                    future.set_exception(exc)
+            return
+
+        while True:
+            batch, kwargs = self._next_batch()
+            batch = [(frame, future) for frame, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            try:
+                boxes = models.predict([frame for frame, _ in batch], **kwargs)
+            except Exception as exc:
+                for _, future in batch:
+                    future.set_exception(exc)
+                continue
+
+            # Cada stream recibe el array de cajas fusionadas de su frame
+            for (_, future), frame_boxes in zip(batch, boxes):
+                future.set_result(frame_boxes)
+
+
+@lru_cache(maxsize=1)
+def get_scheduler() -> InferenceScheduler:
+    """Devuelve el planificador compartido por todos los streams del proceso."""
+    return InferenceScheduler()
@@ -0,0 +1,46 @@
+"""Codificación JPEG por perfil (ancho máximo + calidad) para los streams MJPEG."""
+
+import os
+from typing import NamedTuple, Optional
+
+import cv2
+
+# Perfil por defecto de los visores que no piden nada (0 = resolución original)
+STREAM_JPEG_QUALITY = int(os.getenv("STREAM_JPEG_QUALITY", "80"))
+STREAM_MAX_WIDTH = int(os.getenv("STREAM_MAX_WIDTH", "0"))
+
+# Valores a los que se redondea lo que pide cada visor: así varios visores
+# con parámetros parecidos comparten la misma codificación.
+WIDTH_LEVELS = (320, 480, 640, 960, 1280, 1920)
+QUALITY_LEVELS = (30, 50, 70, 80, 90)
+
+MJPEG_MEDIA_TYPE = "multipart/x-mixed-replace; boundary=frame"
+
+
+class StreamProfile(NamedTuple):
+    width: int  # 0 = sin reescalar
+    quality: int
+
+
+def _snap(value: int, levels) -> int:
+    return min(levels, key=lambda level: abs(level - value))
+
+
+def stream_profile(width: Optional[int] = None, quality: Optional[int] = None) -> StreamProfile:
+    """Normaliza los parámetros de un visor a uno de los perfiles compartidos."""
+    width = STREAM_MAX_WIDTH if width is None else width
+    quality = STREAM_JPEG_QUALITY if quality is None else quality
+    return StreamProfile(_snap(width, WIDTH_LEVELS) if width else 0, _snap(quality, QUALITY_LEVELS))
+
+
+def encode_jpeg(image, profile: StreamProfile) -> Optional[bytes]:
+    """Reduce (si hace falta) y codifica; None si cv2 no pudo codificar."""
+    h, w = image.shape[:2]
+    if profile.width and w > profile.width:
+        image = cv2.resize(image, (profile.width, round(h * profile.width / w)), interpolation=cv2.INTER_AREA)
+    ok, jpeg = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, profile.quality])
+    return jpeg.tobytes() if ok else None
+
+
+def mjpeg_part(jpeg: bytes) -> bytes:
+    return b"--frame\r\nContent-Type: image/jpeg\r\n\r\n" + jpeg + b"\r\n"
@@ -1,13 +1,243 @@
 import os
-from functools import lru_cache
-from ultralytics import YOLO
+import threading
+import time
+from typing import NamedTuple, Optional, Tuple
 
+import numpy as np
 
-@lru_cache(maxsize=1)
-def get_model():
+from detector.box_filter import result_to_array
+
+# Runtime de inferencia: torch (PyTorch eager), onnx (ONNX Runtime),
+# openvino o torchscript. Los tres últimos usan el modelo exportado con
+# `python -m detector.export_model`, que queda junto al .pt.
+INFER_BACKEND = os.getenv("INFER_BACKEND", "torch").lower()
+
+# Tamaño de entrada con el que se exportan los modelos
+INFER_IMGSZ = int(os.getenv("INFER_IMGSZ", "640"))
+
+# Frame (alto, ancho) con el que se calientan los modelos al arrancar la API
+WARMUP_FRAME_SHAPE = (480, 640, 3)
+
+# Formato de exportación de Ultralytics y sufijo del artefacto por backend
+BACKENDS = {
+    "torch": None,
+    "onnx": ("onnx", ".onnx"),
+    "openvino": ("openvino", "_openvino_model"),
+    "torchscript": ("torchscript", ".torchscript"),
+}
+
+
+def exported_path(weights: str, backend: str) -> str:
+    """Ruta del modelo exportado para un backend (models/guns.pt -> models/guns.onnx)."""
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend desconocido: {backend} (opciones: {', '.join(BACKENDS)})")
+    if BACKENDS[backend] is None:
+        return weights
+    stem, _ = os.path.splitext(weights)
+    return stem + BACKENDS[backend][1]
+
+
+def export_model(weights: str, backend: str, imgsz: int = INFER_IMGSZ) -> str:
+    """
+    Exporta un .pt al formato del backend y devuelve la ruta generada. ONNX y
+    OpenVINO se exportan con batch dinámico para que el planificador de
+    inferencia pueda seguir agrupando frames de varias cámaras.
+    """
+    from ultralytics import YOLO
+
+    if BACKENDS.get(backend) is None:
+        raise ValueError(f"No hay nada que exportar para el backend: {backend}")
+    fmt = BACKENDS[backend][0]
+    kwargs = {"dynamic": True} if backend in ("onnx", "openvino") else {}
+    YOLO(weights).export(format=fmt, imgsz=imgsz, **kwargs)
+    return exported_path(weights, backend)
+
+
+def resolve_model(weights: str, backend: str = INFER_BACKEND) -> Tuple[str, str]:
+    """
+    Artefacto y backend que se van a usar de verdad: si falta el exportado
+    se avisa y se vuelve al .pt con PyTorch.
+    """
+    path = exported_path(weights, backend)
+    if backend != "torch" and not os.path.exists(path):
+        print(f"[MODEL] No existe {path}; se usa PyTorch. Exportar con: "
+              f"python -m detector.export_model --backend {backend} {weights}")
+        return weights, "torch"
+    return path, backend
+
+
+def _open_model(path: str, backend: str):
+    # ultralytics se importa acá y no al cargar el módulo: arrastra torch
+    # (varios segundos) y la API arranca y atiende sin esperarlo
+    from ultralytics import YOLO
+
+    print(f"[MODEL] Cargando {path} (backend: {backend})")
+    return YOLO(path, task="detect")
+
+
+def load_model(weights: str, backend: str = INFER_BACKEND):
+    """
+    Carga el modelo con el backend pedido. Ultralytics envuelve cualquiera de
+    ellos en la misma interfaz (model(frames, conf=, iou=) -> Results con
+    .boxes.data y .names), así que el resto del código no cambia. Si falta
+    el artefacto exportado se usa PyTorch (ver resolve_model).
+    """
+    return _open_model(*resolve_model(weights, backend))
+
+
+def _parse_pairs(value: str) -> dict:
+    """"guns=models/guns.pt,knifes=models/knifes.pt" -> {"guns": "models/guns.pt", ...}"""
+    pairs = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        name, _, val = item.partition("=")
+        pairs[name.strip()] = val.strip()
+    return pairs
+
+
+class ModelSpec(NamedTuple):
+    name: str
+    path: str
+    conf_soft: Optional[float] = None   # conf de predicción propio (None = el del detector)
+    conf_hard: Optional[float] = None   # umbral de alerta propio (None = el del detector)
+    threat_classes: Tuple[int, ...] = (0,)
+
+
+def model_specs_from_env() -> list:
+    """
+    MODELS="guns=models/guns.pt,knifes=models/knifes.pt" carga varios modelos;
+    sin MODELS se usa solo MODEL_PATH (o models/guns.pt). Umbrales por modelo
+    con MODEL_CONF_SOFT / MODEL_CONF_HARD="knifes=0.50,...". Para cada modelo
+    la clase 0 es la amenaza, como hasta ahora.
+    """
+    models = _parse_pairs(os.getenv("MODELS", ""))
+    if not models:
+        path = os.getenv("MODEL_PATH", "models/guns.pt")
+        models = {os.path.splitext(os.path.basename(path))[0]: path}
+    soft = _parse_pairs(os.getenv("MODEL_CONF_SOFT", ""))
+    hard = _parse_pairs(os.getenv("MODEL_CONF_HARD", ""))
+    return [
+        ModelSpec(
+            name,
+            path,
+            float(soft[name]) if name in soft else None,
+            float(hard[name]) if name in hard else None,
+        )
+        for name, path in models.items()
+    ]
+
+
+class ModelEnsemble:
     """
-    Carga el modelo YOLO una sola vez y lo reutiliza.
-    Usa MODEL_PATH del entorno o models/guns.pt por defecto.
+    Varios modelos cargados una sola vez que corren sobre los mismos frames
+    (uno tras otro, cada uno con el batch completo). Las cajas se fusionan en
+    un único array con un espacio de clases global: la clase c del modelo i
+    pasa a ser offset_i + c, y `names` traduce esos ids. Así un único decode
+    e inferencia por frame alimenta la lógica de alertas de todas las amenazas.
     """
-    model_path = os.getenv("MODEL_PATH", "models/guns.pt")
-    return YOLO(model_path)
+
+    def __init__(self, specs, backend: str = INFER_BACKEND):
+        self.specs = list(specs)
+        resolved = [resolve_model(spec.path, backend) for spec in self.specs]
+        # Backend con el que quedó cada modelo (puede ser torch aunque se
+        # haya pedido otro, si faltaba el exportado)
+        self.backends = [used for _, used in resolved]
+        self.models = [_open_model(path, used) for path, used in resolved]
+        self.names = {}
+        self._offsets = []
+        threats, self._hard = [], []
+        for spec, model in zip(self.specs, self.models):
+            offset = len(self.names)
+            self._offsets.append(offset)
+            for cls, label in sorted(model.names.items()):
+                # Prefijo solo si dos modelos usan el mismo nombre de clase
+                taken = label in self.names.values()
+                self.names[offset + cls] = f"{spec.name}:{label}" if taken else label
+                self._hard.append(spec.conf_hard)
+            threats.extend(offset + cls for cls in spec.threat_classes)
+        self.threat_classes = np.array(threats, dtype=np.int64)
+
+    def conf_hard(self, default: float) -> np.ndarray:
+        """Umbral de alerta por clase global: el del modelo o el default del detector."""
+        return np.array([default if h is None else h for h in self._hard], dtype=np.float32)
+
+    def predict(self, frames, conf: float, iou: float, imgsz: Optional[int] = None) -> list:
+        """
+        Un array de cajas fusionadas (x1, y1, x2, y2, conf, cls global) por
+        frame. imgsz cambia el tamaño de entrada (por fuente); los modelos
+        exportados a tamaño fijo solo aceptan el de exportación.
+        """
+        merged = [[] for _ in frames]
+        size = {"imgsz": imgsz} if imgsz else {}
+        for spec, model, offset in zip(self.specs, self.models, self._offsets):
+            results = model(frames, conf=conf if spec.conf_soft is None else spec.conf_soft, iou=iou, verbose=False, **size)
+            for boxes, result in zip(merged, results):
+                data = result_to_array(result)
+                if offset:
+                    data = data.copy()  # no tocar el tensor del Results
+                    data[:, -1] += offset
+                boxes.append(data)
+        if len(self.models) == 1:
+            return [boxes[0] for boxes in merged]
+        return [np.concatenate(boxes) for boxes in merged]
+
+
+_models = None
+_models_lock = threading.Lock()
+
+
+def get_models() -> ModelEnsemble:
+    """
+    Carga los modelos una sola vez y los reutiliza (API, video y live).
+    Con lock y no lru_cache: el hub y el planificador lo piden a la vez
+    desde hilos distintos y no deben cargar dos copias.
+    Ver model_specs_from_env para la configuración.
+    """
+    global _models
+    with _models_lock:
+        if _models is None:
+            _models = ModelEnsemble(model_specs_from_env(), INFER_BACKEND)
+        return _models
+
+
+_warmup = {"status": "pending"}   # pending | warming | ready | error
+
+
+def warmup_status() -> dict:
+    """Estado del calentamiento para /ready (copia)."""
+    return dict(_warmup)
+
+
+def warm_up_models(imgsizes=(None,)):
+    """
+    Carga los modelos y les pasa un frame negro por cada tamaño de entrada
+    que se usa (imgsz None = el del modelo), para que el primer frame real
+    no pague el import de ultralytics/torch, la lectura de los pesos ni la
+    primera pasada (donde ONNX Runtime y OpenVINO preparan el grafo). Se
+    corre en un hilo al arrancar la API; si llega tráfico antes, get_models
+    espera la misma carga en vez de hacer otra. Las pasadas van por el
+    planificador de inferencia, único hilo que usa los modelos compartidos.
+    """
+    from detector.inference_scheduler import get_scheduler
+
+    _warmup.update(status="warming")
+    started = time.perf_counter()
+    try:
+        models = get_models()
+        scheduler = get_scheduler()
+        frame = np.zeros(WARMUP_FRAME_SHAPE, dtype=np.uint8)
+        for imgsz in imgsizes:
+            # Los umbrales no importan: solo se descarta el resultado
+            size = {"imgsz": imgsz} if imgsz else {}
+            scheduler.infer("warmup", frame, conf=0.5, iou=0.5, **size)
+    except Exception as exc:
+        _warmup.update(status="error", error=str(exc))
+        print(f"[MODEL] Falló la carga/calentamiento de los modelos: {exc}")
+        return
+    seconds = round(time.perf_counter() - started, 2)
+    _warmup.update(
+        status="ready",
+        seconds=seconds,
+        backend=",".join(sorted(set(models.backends))),
+        models=[spec.name for spec in models.specs],
+    )
+    print(f"[MODEL] Modelos listos en {seconds}s")
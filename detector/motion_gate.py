@@ -0,0 +1,91 @@
+"""Pre-filtro de movimiento barato para no correr YOLO sobre escenas estáticas."""
+
+import os
+
+import cv2
+
+# Activa el filtro de movimiento en streams y videos (0/1)
+MOTION_GATE = os.getenv("MOTION_GATE", "0") == "1"
+
+# Fracción mínima de píxeles que deben cambiar para correr el modelo
+MOTION_THRESHOLD = float(os.getenv("MOTION_THRESHOLD", "0.01"))
+
+# Diferencia de gris (0-255) a partir de la cual un píxel se considera cambiado
+MOTION_PIXEL_DELTA = int(os.getenv("MOTION_PIXEL_DELTA", "25"))
+
+# Latido: se corre el modelo al menos cada N frames aunque no haya movimiento
+MOTION_HEARTBEAT = int(os.getenv("MOTION_HEARTBEAT", "30"))
+
+# Ancho del frame reducido sobre el que se compara
+MOTION_WIDTH = 160
+
+
+class MotionGate:
+    """
+    Decide por frame si vale la pena correr YOLO. Trabaja sobre una versión
+    reducida en escala de grises y la compara con el último frame que sí se
+    analizó:
+
+        cambio = |gris - gris_ref| > MOTION_PIXEL_DELTA
+        fracción = píxeles_cambiados / píxeles_totales
+
+    Si fracción ≥ threshold, o pasaron heartbeat frames sin analizar, se
+    corre el modelo y el frame pasa a ser la nueva referencia. Comparar contra
+    el último analizado (y no contra el anterior) hace que movimientos lentos
+    acumulen cambio hasta disparar.
+    """
+
+    def __init__(
+        self,
+        threshold: float = MOTION_THRESHOLD,
+        pixel_delta: int = MOTION_PIXEL_DELTA,
+        heartbeat: int = MOTION_HEARTBEAT,
+        width: int = MOTION_WIDTH,
+    ):
+        self.threshold = threshold
+        self.pixel_delta = pixel_delta
+        self.heartbeat = heartbeat
+        self.width = width
+        self._reference = None
+        self._since_inference = 0
+        self.checked = 0
+        self.skipped = 0
+
+    def _prepare(self, frame):
+        h, w = frame.shape[:2]
+        small = cv2.resize(frame, (self.width, max(1, h * self.width // w)), interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(gray, (5, 5), 0)
+
+    def should_infer(self, frame) -> bool:
+        self.checked += 1
+        gray = self._prepare(frame)
+
+        if self._reference is None or self._reference.shape != gray.shape:
+            run = True
+        elif self._since_inference + 1 >= self.heartbeat:
+            run = True
+        else:
+            diff = cv2.absdiff(gray, self._reference)
+            changed = cv2.countNonZero(cv2.threshold(diff, self.pixel_delta, 255, cv2.THRESH_BINARY)[1])
+            run = changed / diff.size >= self.threshold
+
+        if run:
+            self._reference = gray
+            self._since_inference = 0
+        else:
+            self._since_inference += 1
+            self.skipped += 1
+        return run
+
+    def stats(self) -> dict:
+        return {
+            "checked": self.checked,
+            "skipped": self.skipped,
+            "skip_ratio": self.skipped / self.checked if self.checked else 0.0,
+        }
+
+
+def make_motion_gate():
+    """Devuelve un MotionGate si MOTION_GATE está activo, si no None."""
+    return MotionGate() if MOTION_GATE else None
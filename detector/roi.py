@@ -0,0 +1,80 @@
+"""Regiones de interés poligonales: recorte antes de inferir y cajas de vuelta al frame completo."""
+
+from typing import Optional
+
+import numpy as np
+
+
+def points_in_polygon(points: np.ndarray, polygon: np.ndarray) -> np.ndarray:
+    """Ray casting vectorizado: máscara de los puntos (N, 2) dentro del polígono (M, 2)."""
+    x, y = points[:, 0:1], points[:, 1:2]
+    x1, y1 = polygon[:, 0], polygon[:, 1]
+    x2, y2 = np.roll(x1, -1), np.roll(y1, -1)
+    crosses = (y1 > y) != (y2 > y)
+    dy = np.where(y2 == y1, 1e-9, y2 - y1)
+    x_cross = (x2 - x1) * (y - y1) / dy + x1
+    return ((crosses & (x < x_cross)).sum(axis=1) % 2) == 1
+
+
+class RegionOfInterest:
+    """
+    Uno o más polígonos (p.ej. puertas) dentro del frame. Solo se infiere el
+    rectángulo que los contiene a todos: cielo, techo y demás zonas quedan
+    fuera y la resolución de entrada se aprovecha en lo que importa. Las
+    cajas se trasladan al frame completo y se descartan las que tienen el
+    centro fuera de todos los polígonos.
+
+    Las coordenadas pueden ser píxeles o fracciones del frame (todas ≤ 1),
+    para que la misma configuración sirva a cualquier resolución.
+    """
+
+    def __init__(self, polygons):
+        self.polygons = [np.asarray(p, dtype=np.float64) for p in polygons]
+        if not self.polygons or any(p.ndim != 2 or p.shape[0] < 3 or p.shape[1] != 2 for p in self.polygons):
+            raise ValueError("Cada ROI debe ser una lista de al menos 3 puntos [x, y]")
+        self.normalized = all(p.max() <= 1.0 for p in self.polygons)
+        self._bound = {}  # (alto, ancho) -> (polígonos en píxeles, rectángulo)
+
+    def _bind(self, shape):
+        """Polígonos en píxeles y rectángulo de recorte para una resolución (se cachea)."""
+        key = shape[:2]
+        bound = self._bound.get(key)
+        if bound is None:
+            h, w = key
+            scale = np.array([w, h]) if self.normalized else np.ones(2)
+            pixels = [p * scale for p in self.polygons]
+            pts = np.concatenate(pixels)
+            x0, y0 = np.clip(np.floor(pts.min(axis=0)), 0, [w, h]).astype(int)
+            x1, y1 = np.clip(np.ceil(pts.max(axis=0)), 0, [w, h]).astype(int)
+            bound = self._bound[key] = (pixels, (x0, y0, max(x1, x0 + 1), max(y1, y0 + 1)))
+        return bound
+
+    def crop(self, frame) -> np.ndarray:
+        """Vista (sin copia) del rectángulo que contiene la ROI."""
+        x0, y0, x1, y1 = self._bind(frame.shape)[1]
+        return frame[y0:y1, x0:x1]
+
+    def to_frame(self, boxes: np.ndarray, shape) -> np.ndarray:
+        """
+        Cajas del recorte de un frame de tamaño `shape` -> coordenadas del
+        frame completo, solo las que tienen el centro dentro de la ROI.
+        """
+        if len(boxes) == 0:
+            return boxes
+        pixels, (x0, y0, _, _) = self._bind(shape)
+        boxes = boxes.copy()
+        boxes[:, [0, 2]] += x0
+        boxes[:, [1, 3]] += y0
+        centers = np.stack([(boxes[:, 0] + boxes[:, 2]) / 2, (boxes[:, 1] + boxes[:, 3]) / 2], axis=1)
+        inside = np.zeros(len(boxes), dtype=bool)
+        for polygon in pixels:
+            inside |= points_in_polygon(centers, polygon)
+        return boxes[inside]
+
+
+def parse_roi(value) -> Optional[RegionOfInterest]:
+    """Lista de polígonos (o un solo polígono) tal como viene de la configuración."""
+    if not value:
+        return None
+    polygons = value if np.ndim(value[0][0]) == 1 else [value]
+    return RegionOfInterest(polygons)
@@ -0,0 +1,207 @@
+"""Tracker liviano por IoU: identidad y contadores de estabilidad por objeto en lugar de una sola caja."""
+
+import itertools
+import os
+from typing import List
+
+import numpy as np
+
+from detector.box_filter import EMPTY_BOXES, filter_boxes, pairwise_iou
+
+# IoU mínimo para asociar una detección con un track existente (misma clase)
+TRACK_MATCH_IOU = float(os.getenv("TRACK_MATCH_IOU", "0.3"))
+
+# IoU contra la posición prevista a partir del cual la caja cuenta como estable
+TRACK_STABLE_IOU = float(os.getenv("TRACK_STABLE_IOU", "0.5"))
+
+# Frames analizados sin asociar antes de olvidar un track (conserva id y
+# cooldown; pasado ese tiempo el cooldown lo hereda el track nuevo que
+# aparezca sobre la misma zona, ver IoUTracker.expire_alerts)
+TRACK_MAX_MISSED = int(os.getenv("TRACK_MAX_MISSED", "15"))
+
+# Detectar cada N frames y propagar las cajas con el tracker en los demás
+DETECT_EVERY = int(os.getenv("DETECT_EVERY", "1"))
+
+_track_ids = itertools.count(1)
+
+
+class Track:
+    """
+    Un objeto seguido entre frames. streak cuenta frames analizados seguidos
+    en los que se asoció una detección; stable_hits, cuántos de ellos la caja
+    coincidió (IoU ≥ TRACK_STABLE_IOU) con donde se esperaba que estuviera.
+    Reemplazan al único frame_streak/stable_hits por fuente.
+    """
+
+    __slots__ = ("id", "box", "conf", "cls", "velocity", "streak", "stable_hits", "missed", "pending", "last_alert")
+
+    def __init__(self, row: np.ndarray):
+        self.id = next(_track_ids)
+        self.box = row[:4].astype(np.float64)
+        self.conf = float(row[-2])
+        self.cls = int(row[-1])
+        self.velocity = np.zeros(4)   # px por frame, para propagar entre detecciones
+        self.streak = 1
+        self.stable_hits = 0
+        self.missed = 0
+        self.pending = 0              # frames propagados desde la última detección
+        self.last_alert = float("-inf")
+
+    def predicted(self, steps: int) -> np.ndarray:
+        return self.box + self.velocity * steps
+
+    def row(self) -> List[float]:
+        return [*self.box, self.conf, self.cls]
+
+    @property
+    def bbox(self):
+        return tuple(int(v) for v in self.box)
+
+
+class IoUTracker:
+    """
+    Asociación greedy por IoU, vectorizada: una matriz IoU (tracks ×
+    detecciones) con NumPy, anulada entre clases distintas, y luego se toman
+    los pares de mayor IoU primero. Las posiciones se predicen con velocidad
+    constante, lo que además permite propagar las cajas en los frames que no
+    pasan por el detector (DETECT_EVERY > 1).
+
+    Un objeto tapado más de max_missed frames pierde su track y reaparece
+    con uno nuevo. Para que eso no saltee el cooldown, los tracks olvidados
+    que ya alertaron quedan en `alerted`, y un track nuevo de la misma clase
+    que se superpone (IoU ≥ match_iou) con uno de ellos hereda su last_alert.
+    Quien conoce el reloj y el cooldown los descarta con expire_alerts().
+    """
+
+    def __init__(
+        self,
+        match_iou: float = TRACK_MATCH_IOU,
+        stable_iou: float = TRACK_STABLE_IOU,
+        max_missed: int = TRACK_MAX_MISSED,
+    ):
+        self.match_iou = match_iou
+        self.stable_iou = stable_iou
+        self.max_missed = max_missed
+        self.tracks: List[Track] = []
+        self.alerted: List[Track] = []   # olvidados con cooldown posiblemente vigente
+
+    def update(self, boxes: np.ndarray) -> List[Track]:
+        """Asocia las detecciones del frame y devuelve los tracks vistos en él."""
+        boxes = boxes if len(boxes) else EMPTY_BOXES
+        steps = [t.pending + 1 for t in self.tracks]
+        matches = []
+        if self.tracks and len(boxes):
+            predicted = np.array([t.predicted(s) for t, s in zip(self.tracks, steps)])
+            iou = pairwise_iou(predicted, boxes[:, :4])
+            iou[np.array([t.cls for t in self.tracks])[:, None] != boxes[None, :, -1].astype(int)] = 0
+            candidates = np.argwhere(iou >= self.match_iou)
+            order = np.argsort(-iou[candidates[:, 0], candidates[:, 1]], kind="stable")
+            used_tracks, used_boxes = set(), set()
+            for ti, di in candidates[order]:
+                if ti in used_tracks or di in used_boxes:
+                    continue
+                used_tracks.add(ti)
+                used_boxes.add(di)
+                matches.append((ti, di, iou[ti, di]))
+        else:
+            used_tracks, used_boxes = set(), set()
+
+        seen = []
+        for ti, di, match_iou in matches:
+            track, row = self.tracks[ti], boxes[di]
+            new_box = row[:4].astype(np.float64)
+            track.velocity = (new_box - track.box) / steps[ti]
+            track.box = new_box
+            track.conf = float(row[-2])
+            track.streak += 1
+            track.stable_hits = track.stable_hits + 1 if match_iou >= self.stable_iou else 0
+            track.missed = 0
+            track.pending = 0
+            seen.append(track)
+
+        survivors = []
+        for ti, track in enumerate(self.tracks):
+            if ti not in used_tracks:
+                # Sin detección en este frame: se reinicia como antes, pero se
+                # conserva un rato para no perder el id (ni su cooldown)
+                track.streak = 0
+                track.stable_hits = 0
+                track.missed += 1
+                track.pending += 1
+                if track.missed > self.max_missed:
+                    if track.last_alert > float("-inf"):
+                        self.alerted.append(track)
+                    continue
+            survivors.append(track)
+
+        for di in range(len(boxes)):
+            if di not in used_boxes:
+                track = Track(boxes[di])
+                self._inherit_alert(track)
+                survivors.append(track)
+                seen.append(track)
+
+        self.tracks = survivors
+        return seen
+
+    def _inherit_alert(self, track: Track):
+        """El track nuevo toma el last_alert del olvidado que más se le superpone."""
+        candidates = [t for t in self.alerted if t.cls == track.cls]
+        if not candidates:
+            return
+        iou = pairwise_iou(track.box[None, :], np.array([t.box for t in candidates]))[0]
+        best = int(np.argmax(iou))
+        if iou[best] >= self.match_iou:
+            track.last_alert = candidates[best].last_alert
+            self.alerted.remove(candidates[best])
+
+    def expire_alerts(self, now: float, cooldown: float):
+        """Descarta los tracks olvidados cuyo cooldown ya terminó."""
+        if self.alerted:
+            self.alerted = [t for t in self.alerted if (now - t.last_alert) <= cooldown]
+
+    def predict(self) -> np.ndarray:
+        """Avanza un frame sin detección y devuelve las cajas propagadas de los tracks visibles."""
+        rows = []
+        for track in self.tracks:
+            track.pending += 1
+            if track.missed:
+                continue
+            rows.append([*track.predicted(track.pending), track.conf, track.cls])
+        return np.array(rows, dtype=np.float32) if rows else EMPTY_BOXES
+
+
+def select_alerts(
+    tracks: List[Track],
+    min_area: float,
+    min_ratio: float,
+    conf_hard,
+    target_cls,
+    streak_required: int,
+    stable_required: int,
+    cooldown: float,
+    now: float,
+) -> List[Track]:
+    """
+    Tracks que disparan alerta en este frame, cada uno con su propio cooldown:
+    caja que pasa los filtros de clase/área/proporción, conf ≥ umbral de su
+    clase, streak y stable_hits suficientes. Marca last_alert en los elegidos.
+    """
+    if not tracks:
+        return []
+    data = np.array([t.row() for t in tracks], dtype=np.float32)
+    mask = filter_boxes(data, min_area, min_ratio, target_cls)
+    hard = conf_hard[data[:, -1].astype(np.int64)] if np.ndim(conf_hard) else np.full(len(data), conf_hard)
+
+    fired = []
+    for track, valid, threshold in zip(tracks, mask, hard):
+        if (
+            valid
+            and track.conf >= threshold
+            and track.streak >= streak_required
+            and track.stable_hits >= stable_required
+            and (now - track.last_alert) > cooldown
+        ):
+            track.last_alert = now
+            fired.append(track)
+    return fired
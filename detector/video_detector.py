@@ -3,209 +3,256 @@
 import cv2
 import time
 import os
-from alerts import send_telegram_alert
-from detector.model_provider import get_model
+import threading
+from typing import Callable, Optional
+from alert_store import record_alert
+from alerts import dispatch_alert
+from detector.annotate import draw_detections
+from detector.box_filter import EMPTY_BOXES
+from detector.engine import DetectionEngine
+from detector.fast_scan import make_fast_scan
+from detector.motion_gate import make_motion_gate
+from detector.source_config import SourceSettings, get_source_settings
+from metrics import ANNOTATE, DECODE, INFERENCE, get_metrics
 
 ALERT_FOLDER = "alerts"
 os.makedirs(ALERT_FOLDER, exist_ok=True)
 
-CONF_SOFT = 0.40
-CONF_HARD = 0.55
-
-# IoU usado para NMS (Non-Maximum Suppression)
-# IoU = área_intersección / área_union
-IOU_NMS = 0.40
-
-# Filtro geométrico: armas reales deben ocupar cierto tamaño mínimo
-MIN_AREA = 2500
-
-# Filtro geométrico: las armas suelen ser alargadas
-# relación = ancho / alto > 1.1
-MIN_RATIO = 1.1
-
-# Número de frames consecutivos donde el objeto debe detectarse
-FRAME_STREAK_REQUIRED = 3
-
-# Tiempo mínimo entre alertas (segundos)
-ALERT_COOLDOWN = 10
-
-
-def process_video_file(path):
+# Umbrales de alerta: perfil "video" de detector/source_config.py (PROFILES),
+# con los cambios de la entrada de SOURCE_CONFIG. El cooldown se mide en
+# segundos de video.
+ENGINE_PROFILE = "video"
+
+# Etiqueta de fuente en /metrics para todos los archivos (un valor por upload no escala)
+METRICS_SOURCE = "video"
+
+# Espera (s) entre reintentos al leer un upload que todavía se está escribiendo
+GROWING_FILE_POLL = 0.5
+
+
+def emit_alert(alert_info: dict, source: str):
+    """Indexa la alerta (para /api/alerts/recent) y la encola para envío."""
+    record_alert(
+        alert_info["image_path"],
+        timestamp=alert_info["created_at"],
+        source=source,
+        conf=alert_info["conf"],
+        cls=alert_info["cls"],
+        bbox=alert_info["bbox"],
+    )
+    dispatch_alert(
+        message=(
+            f"⚠️ ARMA DETECTADA ({alert_info['cls']})\n"
+            f"Confianza: {alert_info['conf']:.2f}\nFecha: {alert_info['timestamp']}"
+        ),
+        photo_path=alert_info["image_path"],
+    )
+
+
+def process_video_file(
+    path,
+    on_frame: Optional[Callable] = None,
+    stop_event: Optional[threading.Event] = None,
+    upload_done: Optional[threading.Event] = None,
+    settings: Optional[SourceSettings] = None,
+    scan_mode: Optional[str] = None,
+    scan_interval: Optional[float] = None,
+    scan_stride: Optional[int] = None,
+    on_progress: Optional[Callable[[int], None]] = None,
+    start_frame: int = 0,
+    end_frame: Optional[int] = None,
+    warmup_frames: int = 0,
+    emit_alerts: bool = True,
+    raise_alerts: bool = True,
+    on_result: Optional[Callable] = None,
+):
     """
     Recorre un archivo de video, corre YOLO en cada frame y dispara alertas
     cuando se cumplen las condiciones configuradas. Guarda frames anotados en
     el directorio ALERT_FOLDER y devuelve metadatos de las alertas.
+
+    Si se pasa on_frame, se llama con (frame, boxes, names) de cada frame para
+    que otros consumidores (p.ej. el stream MJPEG) reutilicen la misma
+    inferencia; el dibujo de las cajas queda a cargo de quien lo necesite.
+
+    Si se pasa upload_done, el archivo todavía se está escribiendo: al
+    quedarse sin frames se espera a que crezca, se reabre y se continúa desde
+    el último frame leído, hasta que upload_done se active.
+
+    settings (por defecto la entrada "default" de SOURCE_CONFIG) fija el
+    tamaño de inferencia, una ROI opcional y los umbrales de alerta, igual
+    que en las cámaras. La decisión por frame es de DetectionEngine.
+
+    scan_mode="fast" (por defecto SCAN_MODE) analiza un frame cada
+    scan_interval segundos (o cada scan_stride frames) y vuelve a analizar
+    frame a frame alrededor de cada candidato; ver detector/fast_scan.py.
+    on_progress recibe la cantidad de frames recorridos (analizados o no).
+
+    start_frame/end_frame limitan el análisis a un tramo [start, end) del
+    video (ver detector/chunked_video.py). Los warmup_frames anteriores a
+    start_frame se analizan para reconstruir el estado de los tracks (racha,
+    estabilidad y cooldown) pero no generan alertas. Con emit_alerts=False
+    las alertas se devuelven (con su imagen guardada) sin indexarlas ni
+    enviarlas; quien llama lo hace luego con emit_alert. Con
+    raise_alerts=False no se evalúan alertas ni se anota nada.
+
+    on_result recibe (índice, cajas, tiempos) de cada frame que pasó por el
+    modelo, con tiempos = {"decode_ms", "infer_ms"} (ver detector/batch.py).
     """
-    model = get_model()
+    stop_event = stop_event or threading.Event()
+    settings = settings or get_source_settings()
+    # Un track por objeto; con detect_every > 1 también propaga las cajas
+    # en los frames que no pasan por YOLO
+    engine = DetectionEngine(settings.engine_config(ENGINE_PROFILE), settings=settings)
+    names = engine.names
+    roi = settings.roi
     cap = cv2.VideoCapture(path)
-
-    frame_streak = 0
-    last_alert_time = 0
-    last_box = None
-    stable_hits = 0
+    motion_gate = make_motion_gate()
+    scan = make_fast_scan(cap, scan_mode, scan_interval, scan_stride)
+    # Sin abrir (upload sin moov todavía) CAP_PROP_FPS da -1 o 0
+    video_fps = cap.get(cv2.CAP_PROP_FPS)
+    video_fps = video_fps if video_fps > 0 else 30.0
+    last_boxes = EMPTY_BOXES
+    metrics = get_metrics()
+    detect_every = settings.detect_every
     alerts = []
 
     last_saved_alert = None
-
-    while True:
+    frames_read = max(0, start_frame - warmup_frames)
+    if frames_read:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, frames_read)
+
+    while not stop_event.is_set():
+        if scan is not None:
+            frames_read = scan.seek(cap, frames_read, scan.next_index(frames_read))
+        if end_frame is not None and frames_read >= end_frame:
+            break
+        read_start = time.perf_counter()
         ret, frame = cap.read()
+        decode_s = time.perf_counter() - read_start
         if not ret:
-            break
-
-        # conf = CONF_SOFT, se activan detecciones preliminares
-        results = model(frame, conf=CONF_SOFT, iou=IOU_NMS, verbose=False)
-
-        # FRAME ANOTADO CON CAJAS
-        annotated = results[0].plot()
-
-        # Flags de detección
-        gun_detected = False
-        hard_hit = False # Se activa si conf >= CONF_HARD
-        best_conf = 0
-        best_box = None
-
-        for box in results[0].boxes:
-            cls = int(box.cls[0])
-            conf = float(box.conf[0])
-            if cls != 0:
-                continue
-
-            # Extraer coordenadas de la caja
-            x1, y1, x2, y2 = map(int, box.xyxy[0])
-            w, h = x2 - x1, y2 - y1
-
-            # Área de la caja → área = w * h
-            area = w * h
-
-            # Proporción geométrica → ratio = w / h
-            ratio = w / h
-
-            # -----------------------------
-            #  HEURÍSTICAS DE FILTRADO
-            # -----------------------------
-            # Fórmulas aplicadas y justificación
-            #
-            # 1. Área mínima:
-            #    área = w*h ≥ MIN_AREA
-            #
-            # 2. Proporción mínima:
-            #    ratio = w/h ≥ MIN_RATIO
-            #
-            # Estas heurísticas eliminan:
-            # - objetos demasiado pequeños,
-            # - objetos cuadrados (celulares, cajas),
-            # - detecciones falsas pequeñas.
-            if area < MIN_AREA or ratio < MIN_RATIO:
+            if upload_done is None:
+                break
+
+            # Archivo en crecimiento: esperar más datos y reabrir donde íbamos.
+            # Si el upload ya terminó, se hace una última pasada y se sale.
+            complete = upload_done.is_set()
+            if not complete:
+                upload_done.wait(GROWING_FILE_POLL)
+            cap.release()
+            cap = cv2.VideoCapture(path)
+            if frames_read and cap.isOpened():
+                cap.set(cv2.CAP_PROP_POS_FRAMES, frames_read)
+            # La primera apertura pudo no tener el índice del contenedor
+            # (fps por defecto); se toma el del archivo con más datos
+            fps = cap.get(cv2.CAP_PROP_FPS)
+            if fps > 0 and fps != video_fps:
+                video_fps = fps
+                if scan is not None:
+                    scan.set_fps(fps)
+            if complete:
+                upload_done = None
+            continue
+
+        metrics.observe(DECODE, METRICS_SOURCE, decode_s)
+        index = frames_read
+        frames_read += 1
+        if on_progress is not None:
+            on_progress(frames_read)
+        dense = scan is None or scan.is_dense(index)
+
+        # Frame intermedio: sin inferencia, cajas propagadas por el tracker
+        if dense and detect_every > 1 and frames_read % detect_every:
+            last_boxes = engine.propagate()
+            if on_frame is not None:
+                on_frame(frame, last_boxes, names)
+            continue
+
+        # Escena estática: no se corre YOLO ni se toca el estado de alertas;
+        # el stream recibe el frame con las últimas cajas conocidas.
+        region = roi.crop(frame) if roi is not None else frame
+        if motion_gate is not None and not motion_gate.should_infer(region):
+            if on_frame is not None:
+                on_frame(frame, last_boxes, names)
+            continue
+
+        # conf_soft: detecciones preliminares de todos los modelos
+        infer_start = time.perf_counter()
+        boxes = engine.detect(frame)
+        last_boxes = boxes
+        infer_s = time.perf_counter() - infer_start
+        metrics.observe(INFERENCE, METRICS_SOURCE, infer_s)
+        metrics.inc("frames", source=METRICS_SOURCE)
+        metrics.inc("detections", len(boxes), source=METRICS_SOURCE)
+        if on_result is not None and index >= start_frame:
+            on_result(index, boxes, {"decode_ms": decode_s * 1000, "infer_ms": infer_s * 1000})
+
+        # El frame anotado no se genera aquí: solo si se guarda una alerta o
+        # si on_frame tiene visores que lo necesiten.
+        if on_frame is not None:
+            on_frame(frame, boxes, names)
+
+        # Modo rápido: una muestra con candidato hace volver atrás y analizar
+        # la zona frame a frame (con un tracker nuevo); las muestras en sí no
+        # alertan porque están demasiado separadas para el tracking.
+        if scan is not None:
+            start = scan.observe(index, engine.is_candidate(boxes))
+            if not dense:
+                if start is not None:
+                    engine.reset()
+                    frames_read = scan.seek(cap, frames_read, start)
                 continue
 
-            # Marca que se detectó arma en este frame
-            gun_detected = True
-
-            # Confirma detección si supera CONF_HARD
-            if conf >= CONF_HARD:
-                hard_hit = True
-
-            # Guardar la mejor detección (mayor confianza)
-            if conf > best_conf:
-                best_conf = conf
-                best_box = (x1, y1, x2, y2)
-
-        # --------------------------------------------------------
-        #        ESTABILIDAD TEMPORAL DEL BOUNDING BOX
-        # --------------------------------------------------------
-        #
-        # Aquí aplicamos una técnica inspirada en "tracking by detection",
-        # donde no se usa un tracker formal, pero sí verificamos que la
-        # detección sea coherente en frames consecutivos.
-        #
-        # Fórmula aplicada:
-        # 
-        #   dx = |x1 - x1_prev| + |x2 - x2_prev|
-        #   dy = |y1 - y1_prev| + |y2 - y2_prev|
-        #
-        # Se calcula el desplazamiento total del bounding box.
-        #
-        #   Si dx + dy < UMBRAL entonces el objeto se considera “estable”.
-        #
-        # Esto evita falsos positivos de YOLO que aparecen 1 frame y desaparecen.
-        #
-        # UMBRAL=90 px se determinó empíricamente probando:
-        # - cámaras estáticas
-        # - movimiento de mano normal
-        # - tamaño típico del arma en frame
-        #
-        # --------------------------------------------------------
-        if gun_detected and best_box:
-            if last_box:
-                lx1, ly1, lx2, ly2 = last_box
-                bx1, by1, bx2, by2 = best_box
-
-                dx = abs(bx1 - lx1) + abs(bx2 - lx2)
-                dy = abs(by1 - ly1) + abs(by2 - ly2)
-
-                # Umbral empírico: 90px
-                if dx + dy < 90:
-                    stable_hits += 1
-                else:
-                    stable_hits = 0
-
-            last_box = best_box
-        else:
-            stable_hits = 0
-            last_box = None
-
-        # -------- STREAK ----------
-        frame_streak = frame_streak + 1 if gun_detected else 0
-
-        now = time.time()
-
-        # -----------------------------
-        #       CONDICIÓN DE ALERTA
-        # -----------------------------
-        #
-        # Una alerta se envía si:
-        #
-        # 1) frame_streak ≥ FRAME_STREAK_REQUIRED
-        # 2) hard_hit == True
-        # 3) stable_hits ≥ 1
-        # 4) cooldown cumplido → (now - last_alert_time) > ALERT_COOLDOWN
-        #
-        # Esta combinación:
-        # - reduce falsos positivos,
-        # - obliga a ver una detección persistente,
-        # - exige confianza alta del modelo,
-        # - impone estabilidad geométrica del bounding box.
-        if (
-            frame_streak >= FRAME_STREAK_REQUIRED
-            and hard_hit
-            and stable_hits >= 2
-            and (now - last_alert_time) > ALERT_COOLDOWN
-        ):
-            last_alert_time = now
+        # Seguimiento por objeto y condición de alerta (ver DetectionEngine).
+        # El cooldown corre con el reloj del video y no con el de pared: así
+        # no depende de lo rápido que se procese, y un tramo que arranca con
+        # warmup reproduce el mismo estado que el análisis secuencial.
+        video_time = index / video_fps
+        decision = engine.update(boxes, video_time if raise_alerts else None)
+        if not raise_alerts:
+            continue
+        if index < start_frame:
+            # Warmup: el estado (incluido last_alert) queda igual que si se
+            # hubiera procesado desde el principio, pero no se alerta
+            continue
+        for track in decision.alerts:
+            now = time.time()
+            threat = names.get(track.cls, "arma")
             timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
 
-            img_path = f"{ALERT_FOLDER}/alert_{int(now)}.jpg"
+            # El índice del frame evita choques entre tramos procesados a la vez
+            img_path = f"{ALERT_FOLDER}/alert_{int(now)}_{index}_{track.id}.jpg"
 
             # GUARDAMOS EL FRAME ANOTADO
+            with metrics.timed(ANNOTATE, METRICS_SOURCE):
+                annotated = draw_detections(frame, boxes, names)
             cv2.imwrite(img_path, annotated)
 
-            send_telegram_alert(
-                message=f"⚠️ ARMA DETECTADA\nConfianza: {best_conf:.2f}\nFecha: {timestamp}",
-                photo_path=img_path,
-            )
-
             alert_info = {
                 "image_path": img_path,
                 "timestamp": timestamp,
-                "conf": best_conf,
+                "created_at": now,
+                "conf": track.conf,
+                "cls": threat,
+                "bbox": track.bbox,
+                "track_id": track.id,
+                "video_time": round(video_time, 2),
             }
+            if emit_alerts:
+                emit_alert(alert_info, os.path.basename(path))
+            metrics.inc("alerts", source=METRICS_SOURCE)
             alerts.append(alert_info)
             last_saved_alert = alert_info
 
     cap.release()
 
-    return {
+    result = {
         "status": "ok",
         "message": "Video procesado con bounding boxes",
         "alerts": alerts,
     }
+    if motion_gate is not None:
+        result["motion"] = motion_gate.stats()
+    if scan is not None:
+        result["scan"] = scan.stats()
+    return result
@@ -0,0 +1,311 @@
+"""Jobs de video subido: una sola decodificación e inferencia por upload, en un pool acotado."""
+
+import os
+import queue
+import threading
+import time
+from typing import Optional
+
+import cv2
+
+from detector.capture_hub import FramePacket
+from detector.fast_scan import SCAN_MODE
+from detector.frame_buffer import FrameRingBuffer
+from detector.video_detector import process_video_file
+
+# Frames que se conservan para los visores que se conectan tarde (crudos:
+# cada uno ocupa lo que un frame decodificado, así que el valor es bajo)
+STREAM_BUFFER_FRAMES = int(os.getenv("VIDEO_STREAM_BUFFER", "16"))
+
+# Videos que se procesan en paralelo y jobs que pueden esperar en cola
+VIDEO_WORKERS = int(os.getenv("VIDEO_WORKERS", "2"))
+VIDEO_QUEUE_SIZE = int(os.getenv("VIDEO_QUEUE_SIZE", "8"))
+
+# Segundos que un job terminado sigue consultable (estado y últimos frames)
+JOB_RETENTION = int(os.getenv("VIDEO_JOB_RETENTION", "60"))
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+
+class JobQueueFull(Exception):
+    """La cola de videos está llena; depth es la cantidad de jobs esperando."""
+
+    def __init__(self, depth: int, capacity: int):
+        super().__init__(f"Cola de videos llena ({depth}/{capacity})")
+        self.depth = depth
+        self.capacity = capacity
+
+
+class VideoJob:
+    """
+    Procesa un archivo subido una única vez: cada frame pasa por YOLO y la
+    lógica de alertas de video_detector. Mientras haya visores conectados, el
+    frame se publica como FramePacket en un buffer circular del que leen
+    todos los streams MJPEG; el paquete se anota y se codifica una vez por
+    perfil JPEG pedido. Sin visores no se dibuja ni se codifica nada.
+
+    El job es dueño del archivo: lo borra al terminar, se complete o no.
+    """
+
+    def __init__(
+        self,
+        job_id: str,
+        path: str,
+        buffer_size: int = STREAM_BUFFER_FRAMES,
+        upload_done: Optional[threading.Event] = None,
+        scan_mode: Optional[str] = None,
+        scan_interval: Optional[float] = None,
+    ):
+        self.id = job_id
+        self.path = path
+        self.upload_done = upload_done
+        self.scan_mode = scan_mode
+        self.scan_interval = scan_interval
+        self.frames = FrameRingBuffer(buffer_size)
+        self.stop_event = threading.Event()
+        self.done = threading.Event()
+        self.status = QUEUED
+        self.result = None
+        self.error = None
+        self.frames_processed = 0
+        self.frames_read = 0      # en modo rápido se recorren más frames de los que se analizan
+        self.total_frames = None
+        self._frames_counted = False
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        # Lo asigna la cola: se llama una sola vez, cuando el job deja de
+        # esperar (arranca o se cancela en cola), para liberar su lugar
+        self._leave_queue = None
+        self._state_lock = threading.Lock()
+
+    def _leave(self, status: str) -> bool:
+        """Pasa de QUEUED a status; False si ya había salido de la cola."""
+        with self._state_lock:
+            if self.status != QUEUED:
+                return False
+            self.status = status
+        if self._leave_queue is not None:
+            self._leave_queue()
+        return True
+
+    def cancel(self):
+        """Cancela el job: si está en cola no llega a correr (y libera su lugar); si corre, se detiene."""
+        self.stop_event.set()
+        self._leave(CANCELLED)
+
+    def _publish(self, frame, boxes, names):
+        self.frames_processed += 1
+        if not self.frames.subscribers:
+            return
+        self.frames.publish(FramePacket(frame, boxes, names, time.time(), source="video"))
+
+    def _progress(self, frames_read: int):
+        self.frames_read = frames_read
+
+    def _count_frames(self):
+        # Solo tiene sentido cuando el archivo ya está completo en disco, y
+        # una sola vez: si el contenedor no informa la cantidad, no se
+        # vuelve a abrir el archivo en cada consulta de /jobs/{id}
+        if self._frames_counted or (self.upload_done is not None and not self.upload_done.is_set()):
+            return
+        self._frames_counted = True
+        cap = cv2.VideoCapture(self.path)
+        count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        cap.release()
+        self.total_frames = count if count > 0 else None
+
+    def run(self):
+        """Corre el job en el hilo actual (lo llama un worker del pool)."""
+        try:
+            if not self._leave(RUNNING):
+                return  # cancelado mientras esperaba
+            self.started_at = time.time()
+            self._count_frames()
+            self.result = process_video_file(
+                self.path,
+                on_frame=self._publish,
+                stop_event=self.stop_event,
+                upload_done=self.upload_done,
+                scan_mode=self.scan_mode,
+                scan_interval=self.scan_interval,
+                on_progress=self._progress,
+            )
+            if self.stop_event.is_set():
+                self.status = CANCELLED
+            elif not self.frames_read:
+                # El upload completo no se pudo leer (dañado, vacío o con
+                # extensión de video sin serlo): no es un análisis sin alertas
+                self.status = FAILED
+                self.error = self._unreadable_reason()
+                print(f"[JOB] Falló {self.id}: {self.error}")
+            else:
+                self.status = DONE
+        except Exception as exc:
+            self.status = FAILED
+            self.error = str(exc)
+            print(f"[JOB] Falló {self.id}: {exc}")
+        finally:
+            self.finished_at = time.time()
+            self.frames.close()
+            self.done.set()
+            self._remove_file()
+
+    def _unreadable_reason(self) -> str:
+        cap = cv2.VideoCapture(self.path)
+        opened = cap.isOpened()
+        cap.release()
+        if not opened:
+            return "No se pudo abrir el video (archivo dañado o en un formato no soportado)"
+        return "El video no tiene frames legibles"
+
+    def _remove_file(self):
+        if os.path.exists(self.path):
+            try:
+                os.remove(self.path)
+                print(f"[CLEANUP] Upload eliminado: {self.path}")
+            except OSError:
+                pass
+
+    def progress(self) -> dict:
+        """Estado, frames procesados, FPS de procesamiento y ETA estimada (según frames recorridos)."""
+        if self.total_frames is None and self.status == RUNNING:
+            self._count_frames()
+
+        fps = None
+        eta = None
+        if self.started_at:
+            elapsed = (self.finished_at or time.time()) - self.started_at
+            if elapsed > 0 and self.frames_processed:
+                fps = self.frames_processed / elapsed
+            if elapsed > 0 and self.frames_read and self.total_frames and self.status == RUNNING:
+                eta = max(self.total_frames - self.frames_read, 0) / (self.frames_read / elapsed)
+
+        return {
+            "id": self.id,
+            "status": self.status,
+            "frames_processed": self.frames_processed,
+            "frames_read": self.frames_read,
+            "scan_mode": self.scan_mode or SCAN_MODE,
+            "total_frames": self.total_frames,
+            "fps": round(fps, 2) if fps else None,
+            "eta_seconds": round(eta, 1) if eta is not None else None,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "alerts": len(self.result["alerts"]) if self.result else 0,
+            "error": self.error,
+        }
+
+    def stream(self, stop_event: Optional[threading.Event] = None, on_skip=None):
+        """
+        Generador de FramePacket: empieza por lo más antiguo que siga en el
+        buffer (solo hay frames de los momentos en que hubo algún visor
+        conectado); un visor que se atrasa salta al más antiguo disponible.
+        """
+        return self.frames.subscribe(from_oldest=True, stop_event=stop_event, on_skip=on_skip)
+
+
+class VideoJobQueue:
+    """
+    Cola acotada + número fijo de workers. Se usan hilos y no procesos porque
+    el stream MJPEG lee los frames del job en memoria. La inferencia no corre
+    en los workers: la hace el hilo del planificador (detector/inference_scheduler.py),
+    único dueño de los modelos, que junta en un batch los frames de los videos
+    en curso y de las cámaras. VIDEO_WORKERS es entonces cuántos videos
+    decodifican, filtran y alertan a la vez mientras esperan ese batch, no
+    cuántas inferencias corren en paralelo. Si la cola está llena, submit()
+    lanza JobQueueFull para que la API responda con backpressure (429).
+    """
+
+    def __init__(self, workers: int = VIDEO_WORKERS, max_queued: int = VIDEO_QUEUE_SIZE):
+        self.capacity = max_queued
+        # Sin límite propio: la capacidad se cuenta en _waiting, que no incluye
+        # los jobs cancelados que siguen en la cola hasta que un worker los saca
+        self._queue = queue.Queue()
+        self._waiting = 0
+        self._jobs = {}
+        self._lock = threading.Lock()
+        for _ in range(max(1, workers)):
+            threading.Thread(target=self._worker, daemon=True).start()
+
+    @property
+    def depth(self) -> int:
+        return self._waiting
+
+    def is_full(self) -> bool:
+        return self._waiting >= self.capacity
+
+    def _release_slot(self):
+        with self._lock:
+            self._waiting -= 1
+
+    def submit(self, job: VideoJob) -> VideoJob:
+        job._leave_queue = self._release_slot
+        with self._lock:
+            if self._waiting >= self.capacity:
+                raise JobQueueFull(self._waiting, self.capacity)
+            self._waiting += 1
+            self._jobs[job.id] = job
+        self._queue.put(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[VideoJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _forget_later(self, job: VideoJob):
+        def forget():
+            with self._lock:
+                if self._jobs.get(job.id) is job:
+                    del self._jobs[job.id]
+
+        timer = threading.Timer(JOB_RETENTION, forget)
+        timer.daemon = True
+        timer.start()
+
+    def _worker(self):
+        while True:
+            job = self._queue.get()
+            try:
+                job.run()
+            finally:
+                self._queue.task_done()
+                self._forget_later(job)
+
+
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> VideoJobQueue:
+    """Cola de videos compartida por el proceso (se crea al primer uso)."""
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            _job_queue = VideoJobQueue()
+        return _job_queue
+
+
+def submit_video_job(
+    job_id: str,
+    path: str,
+    upload_done: Optional[threading.Event] = None,
+    scan_mode: Optional[str] = None,
+    scan_interval: Optional[float] = None,
+) -> VideoJob:
+    """
+    Encola el job de un upload. Con upload_done el job puede empezar sobre el
+    prefijo ya escrito mientras el archivo sigue llegando. scan_mode/interval
+    eligen el análisis completo o rápido (por defecto SCAN_MODE). Lanza JobQueueFull.
+    """
+    job = VideoJob(job_id, path, upload_done=upload_done, scan_mode=scan_mode, scan_interval=scan_interval)
+    return get_job_queue().submit(job)
+
+
+def get_video_job(job_id: str) -> Optional[VideoJob]:
+    return get_job_queue().get(job_id)
@@ -0,0 +1,188 @@
+"""Métricas en memoria con formato de texto de Prometheus: tiempos por etapa y fuente, y contadores."""
+
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Callable, Iterable, Tuple
+
+# METRICS_ENABLED=0 desactiva la recolección (observe/inc pasan a no hacer
+# nada). Se lee en get_metrics(), no al importar: alerts.py importa este
+# módulo antes de cargar el .env
+
+# Prefijo de todas las métricas exportadas
+METRICS_PREFIX = "weapons"
+
+# Límites (segundos) de los buckets de los histogramas de tiempo
+TIMING_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# Etapas que se miden (etiqueta stage del histograma)
+DECODE = "decode"          # lectura + decodificación (en cámaras incluye la espera del frame)
+INFERENCE = "inference"    # modelo(s), incluida la espera del batch en cámaras
+ANNOTATE = "annotate"      # dibujo de cajas
+ENCODE = "encode"          # JPEG por perfil de stream
+ALERT_SEND = "alert_send"  # entrega a un sink, con reintentos (source = sink)
+
+COUNTERS = {
+    "frames": "Frames que pasaron por el modelo",
+    "detections": "Cajas detectadas (antes de los filtros de alerta)",
+    "alerts": "Alertas generadas",
+    "alert_send_failures": "Alertas que un sink no pudo entregar tras los reintentos",
+    "alerts_dropped": "Alertas descartadas por cola de envío llena",
+    "frames_dropped": "Frames de cámara descartados por llegar otro más nuevo antes de analizarlos",
+    "stream_frames": "Frames enviados a visores MJPEG",
+    "stream_frames_dropped": "Frames que un visor lento se saltó",
+}
+
+
+def source_label(source) -> str:
+    """
+    Etiqueta acotada y sin secretos para una fuente: "webcam:0", la URL RTSP
+    sin usuario/clave ni query, o el nombre dado (p.ej. "video").
+    """
+    if isinstance(source, int) or str(source).isdigit():
+        return f"webcam:{source}"
+    text = str(source)
+    scheme, sep, rest = text.partition("://")
+    if not sep:
+        return text
+    host_path = rest.rsplit("@", 1)[-1].split("?", 1)[0]
+    return f"{scheme}://{host_path}"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value) -> str:
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def _labels(pairs: Iterable[Tuple[str, str]]) -> str:
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in pairs) + "}"
+
+
+class Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, size: int):
+        self.counts = [0] * size   # no acumulados; el último es +Inf
+        self.sum = 0.0
+        self.count = 0
+
+
+class MetricsRegistry:
+    """
+    Histogramas por (etapa, fuente) y contadores con etiquetas libres. Cada
+    observación es un bisect y tres sumas bajo un lock, despreciable frente
+    a decodificar o inferir. Los buckets se acumulan recién al exportar.
+    Los collectors agregan valores que se leen al momento (colas, sesiones).
+
+    Con keep_samples además se guarda cada duración (para percentiles
+    exactos en benchmarks/bench_pipeline.py); en producción queda apagado.
+    """
+
+    def __init__(self, buckets=TIMING_BUCKETS, enabled: bool = True, keep_samples: bool = False):
+        self.buckets = tuple(buckets)
+        self.enabled = enabled
+        self.keep_samples = keep_samples
+        self._histograms = {}   # (stage, source) -> Histogram
+        self._samples = {}      # (stage, source) -> [segundos, ...]
+        self._counters = {}     # (name, ((label, valor), ...)) -> float
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, source: str, seconds: float):
+        if not self.enabled:
+            return
+        slot = bisect_left(self.buckets, seconds)
+        with self._lock:
+            hist = self._histograms.get((stage, source))
+            if hist is None:
+                hist = self._histograms[(stage, source)] = Histogram(len(self.buckets) + 1)
+            hist.counts[slot] += 1
+            hist.sum += seconds
+            hist.count += 1
+            if self.keep_samples:
+                self._samples.setdefault((stage, source), []).append(seconds)
+
+    def samples(self, stage: str) -> list:
+        """Duraciones guardadas de una etapa (todas las fuentes); vacío sin keep_samples."""
+        with self._lock:
+            return [v for (name, _), values in self._samples.items() if name == stage for v in values]
+
+    def counter(self, name: str) -> float:
+        """Total de un contador sumando todas sus etiquetas."""
+        with self._lock:
+            return sum(value for (counter, _), value in self._counters.items() if counter == name)
+
+    @contextmanager
+    def timed(self, stage: str, source: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, source, time.perf_counter() - start)
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        if not self.enabled or not amount:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def add_collector(self, collector: Callable[[], Iterable[Tuple[str, str, dict, float]]]):
+        """collector() -> [(nombre, ayuda, etiquetas, valor)], exportados como gauge."""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """Texto en formato de exposición de Prometheus (text/plain; version=0.0.4)."""
+        with self._lock:
+            histograms = {key: (list(h.counts), h.sum, h.count) for key, h in self._histograms.items()}
+            counters = dict(self._counters)
+
+        lines = []
+        name = f"{METRICS_PREFIX}_stage_seconds"
+        lines += [f"# HELP {name} Duración de cada etapa por fuente", f"# TYPE {name} histogram"]
+        for (stage, source), (counts, total, count) in sorted(histograms.items()):
+            base = (("stage", stage), ("source", source))
+            cumulative = 0
+            for bound, n in zip(self.buckets + ("+Inf",), counts):
+                cumulative += n
+                lines.append(f"{name}_bucket{_labels(base + (('le', bound),))} {cumulative}")
+            lines.append(f"{name}_sum{_labels(base)} {total}")
+            lines.append(f"{name}_count{_labels(base)} {count}")
+
+        by_name = {}
+        for (counter, labels), value in counters.items():
+            by_name.setdefault(counter, []).append((labels, value))
+        for counter in sorted(by_name):
+            name = f"{METRICS_PREFIX}_{counter}_total"
+            lines += [f"# HELP {name} {COUNTERS.get(counter, counter)}", f"# TYPE {name} counter"]
+            for labels, value in sorted(by_name[counter]):
+                lines.append(f"{name}{_labels(labels) if labels else ''} {_number(value)}")
+
+        gauges = {}
+        for collector in self._collectors:
+            try:
+                for gauge, help_text, labels, value in collector():
+                    gauges.setdefault(gauge, (help_text, []))[1].append((labels, value))
+            except Exception as exc:
+                print(f"[METRICS] Falló un collector: {exc}")
+        for gauge in sorted(gauges):
+            help_text, samples = gauges[gauge]
+            name = f"{METRICS_PREFIX}_{gauge}"
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+            for labels, value in samples:
+                lines.append(f"{name}{_labels(sorted(labels.items())) if labels else ''} {_number(value)}")
+
+        return "\n".join(lines) + "\n"
+
+
+@lru_cache(maxsize=1)
+def get_metrics() -> MetricsRegistry:
+    """Registro compartido por todo el proceso."""
+    return MetricsRegistry(enabled=os.getenv("METRICS_ENABLED", "1") == "1")
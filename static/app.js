@@ -1,7 +1,10 @@
 let recentDetections = [];
 let alertsInterval = null;
+let alertsSource = null;
 let currentStreamUrl = null;
+let currentSessionId = null;
 let latestAlertSeen = 0;
+let latestAlertId = null;
 
 // File input handler
 document.getElementById('videoFile').addEventListener('change', function(e) {
@@ -124,17 +127,53 @@ async function loadRecentAlerts() {
             }
         }
 
-        recentDetections = data.map(item => ({
-            id: item.image,
-            imageUrl: item.image,
-            timestamp: item.timestamp ? new Date(item.timestamp * 1000) : new Date(),
-        }));
+        // Desde dónde retoma el feed SSE (0 = no había ninguna todavía)
+        latestAlertId = data.reduce((max, item) => Math.max(max, item.id || 0), 0);
+
+        recentDetections = data.map(alertToDetection);
         updateCarousel();
     } catch (e) {
         console.error('No se pudieron cargar alertas recientes', e);
     }
 }
 
+function alertToDetection(item) {
+    return {
+        id: item.id || item.image,
+        imageUrl: item.image,
+        timestamp: item.timestamp ? new Date(item.timestamp * 1000) : new Date(),
+    };
+}
+
+// Feed en vivo por SSE: el servidor empuja cada alerta al guardarla.
+// Se abre desde la última alerta cargada, así no se pierden las guardadas
+// entre loadRecentAlerts() y la conexión; al reconectar, EventSource envía
+// Last-Event-ID y se reciben las perdidas.
+function startAlertsFeed() {
+    if (alertsSource || alertsInterval) return;
+
+    if (!window.EventSource) {
+        startAlertsPolling();
+        return;
+    }
+
+    const resume = latestAlertId === null ? '' : `?last_event_id=${latestAlertId}`;
+    alertsSource = new EventSource(`/api/alerts/stream${resume}`);
+    alertsSource.addEventListener('alert', event => {
+        const item = JSON.parse(event.data);
+        if (recentDetections.some(d => d.id === item.id)) return;
+
+        recentDetections.unshift(alertToDetection(item));
+        if (recentDetections.length > 10) {
+            recentDetections.pop();
+        }
+        latestAlertSeen = item.timestamp ? item.timestamp * 1000 : Date.now();
+        updateCarousel();
+        showToast('⚠️ Nueva alerta de arma detectada y notificada');
+    });
+}
+
+// Respaldo para navegadores sin EventSource
 function startAlertsPolling(intervalMs = 3000) {
     stopAlertsPolling();
     loadRecentAlerts();
@@ -214,8 +253,6 @@ function uploadVideo() {
             const streamUrl = res.stream_url || `/stream/video?file=${res.file}`;
             // Mostrar stream de inmediato mientras se procesa en segundo plano
             showStream(streamUrl, 'Video Subido - Detección en Vivo');
-            // Cargar alertas guardadas (todas) desde backend (pequeño delay para que se escriban)
-            setTimeout(startAlertsPolling, 1500);
             showAlert('uploadAlert', 'Video procesado exitosamente', 'success');
         })
         .catch(err => {
@@ -234,13 +271,11 @@ function showWebcam() {
             if (!r.ok) throw new Error("No se pudo iniciar la detección en webcam");
             return r.json();
         })
-        .then(() => {
+        .then(res => {
             // 2) Mostrar el stream anotado
             const streamUrl = '/stream';
             showStream(streamUrl, 'Webcam - Detección en Vivo');
-
-            // 3) Iniciar el polling para ver nuevas alertas
-            startAlertsPolling();
+            currentSessionId = res.session_id || null;
 
             showToast("Detección de webcam iniciada correctamente.", "success");
         })
@@ -265,7 +300,6 @@ function showRTSP() {
 
     const streamUrl = `/stream/rtsp?url=${encodeURIComponent(url)}`;
     showStream(streamUrl, 'Cámara RTSP - Detección en Vivo');
-    startAlertsPolling();
     showAlert('rtspAlert', 'Conectado a cámara RTSP', 'success');
 }
 
@@ -283,7 +317,7 @@ function showStream(streamUrl, title) {
     displayTitle.textContent = title;
     statusBadgeContainer.style.display = 'block';
     stopBtn.style.display = 'flex';
-    startAlertsPolling();
+    startAlertsFeed();
     
     videoDisplay.scrollIntoView({ behavior: 'smooth', block: 'nearest' });
 }
@@ -305,13 +339,17 @@ function stopTransmission() {
     statusBadgeContainer.style.display = 'none';
     stopBtn.style.display = 'none';
     displayTitle.textContent = 'Detección en Tiempo Real';
-    stopAlertsPolling();
-    // Notificar al backend para detener la captura
-    fetch('/stream/stop', { method: 'POST' }).catch(() => {});
+    // Al cortar el <img> el backend cierra la sesión si era el último visor;
+    // la detección en segundo plano se detiene por su id, sin afectar a las
+    // cámaras de otros operadores.
+    if (currentSessionId) {
+        fetch(`/sessions/${currentSessionId}/stop`, { method: 'POST' }).catch(() => {});
+        currentSessionId = null;
+    }
 }
 
-// Cargar alertas ya existentes al abrir la página
-loadRecentAlerts();
+// Cargar alertas ya existentes al abrir la página y quedar escuchando las nuevas
+loadRecentAlerts().then(startAlertsFeed);
 
 function openModal(imageUrl) {
     const modal = document.getElementById('imageModal');
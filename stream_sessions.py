@@ -0,0 +1,137 @@
+"""Registro de sesiones de stream: una por fuente, con id propio, stop individual y métricas."""
+
+import threading
+import time
+import uuid
+from functools import lru_cache
+from typing import Optional
+
+from detector.capture_hub import get_source
+from detector.video_job import get_video_job
+
+WEBCAM = "webcam"
+RTSP = "rtsp"
+VIDEO = "video"
+
+
+class StreamSession:
+    """
+    Todo lo que se está haciendo sobre una fuente (webcam, URL RTSP o job de
+    video): visores MJPEG conectados y, en vivo, el hilo de detección de
+    alertas. Todos comparten stop_event, así que detener la sesión corta solo
+    esa fuente. Cuando se van el último visor y la detección la sesión se
+    cierra sola (y el hub libera la cámara al soltar su última referencia).
+    """
+
+    def __init__(self, kind: str, source):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.source = source
+        self.stop_event = threading.Event()
+        self.viewers = 0
+        self.detecting = False
+        self.created_at = time.time()
+
+    @property
+    def idle(self) -> bool:
+        return self.viewers == 0 and not self.detecting
+
+    def info(self) -> dict:
+        data = {
+            "id": self.id,
+            "kind": self.kind,
+            "source": str(self.source),
+            "viewers": self.viewers,
+            "detecting": self.detecting,
+            "created_at": self.created_at,
+            "fps": None,
+            "inference_ms": None,
+        }
+        if self.kind == VIDEO:
+            job = get_video_job(self.source)
+            if job is not None:
+                progress = job.progress()
+                data.update(fps=progress["fps"], status=progress["status"])
+        else:
+            reader = get_source(self.source)
+            if reader is not None:
+                data.update(reader.stats())
+        return data
+
+
+class SessionRegistry:
+    """Sesiones activas por id y por (tipo, fuente)."""
+
+    def __init__(self):
+        self._sessions = {}
+        self._by_source = {}
+        self._lock = threading.Lock()
+
+    def _open(self, kind: str, source) -> StreamSession:
+        session = self._by_source.get((kind, source))
+        if session is None:
+            session = StreamSession(kind, source)
+            self._sessions[session.id] = session
+            self._by_source[(kind, source)] = session
+            print(f"[SESSION] Abierta {session.id} ({kind}: {source})")
+        return session
+
+    def _close_if_idle(self, session: StreamSession):
+        if not session.idle or self._sessions.get(session.id) is not session:
+            return
+        del self._sessions[session.id]
+        del self._by_source[(session.kind, session.source)]
+        print(f"[SESSION] Cerrada {session.id} ({session.kind}: {session.source})")
+
+    def add_viewer(self, kind: str, source) -> StreamSession:
+        with self._lock:
+            session = self._open(kind, source)
+            session.viewers += 1
+            return session
+
+    def remove_viewer(self, session: StreamSession):
+        with self._lock:
+            session.viewers -= 1
+            self._close_if_idle(session)
+
+    def start_detection(self, kind: str, source) -> Optional[StreamSession]:
+        """Marca la detección de la fuente; None si ya había una corriendo."""
+        with self._lock:
+            session = self._open(kind, source)
+            if session.detecting:
+                return None
+            session.detecting = True
+            return session
+
+    def end_detection(self, session: StreamSession):
+        with self._lock:
+            session.detecting = False
+            self._close_if_idle(session)
+
+    def get(self, session_id: str) -> Optional[StreamSession]:
+        with self._lock:
+            return self._sessions.get(session_id)
+
+    def list(self) -> list:
+        with self._lock:
+            return list(self._sessions.values())
+
+    def stop(self, session: StreamSession):
+        """Detiene visores y detección de la sesión; una fuente nueva abre otra sesión."""
+        session.stop_event.set()
+        with self._lock:
+            if self._sessions.get(session.id) is session:
+                del self._sessions[session.id]
+                del self._by_source[(session.kind, session.source)]
+        print(f"[SESSION] Detenida {session.id} ({session.kind}: {session.source})")
+
+    def stop_all(self) -> int:
+        sessions = self.list()
+        for session in sessions:
+            self.stop(session)
+        return len(sessions)
+
+
+@lru_cache(maxsize=1)
+def get_session_registry() -> SessionRegistry:
+    return SessionRegistry()
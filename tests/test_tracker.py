@@ -0,0 +1,50 @@
+"""Cooldown por objeto del tracker cuando el objeto queda tapado más de max_missed frames."""
+
+import numpy as np
+
+from detector.tracker import IoUTracker, select_alerts
+
+MAX_MISSED = 3
+COOLDOWN = 10.0
+GUN = np.array([[100, 100, 260, 180, 0.9, 0]], dtype=np.float32)
+EMPTY = np.zeros((0, 6), dtype=np.float32)
+
+
+def step(tracker, boxes, now):
+    tracks = tracker.update(boxes)
+    tracker.expire_alerts(now, COOLDOWN)
+    return select_alerts(tracks, 1500, 1.1, 0.6, [0], 1, 0, COOLDOWN, now)
+
+
+def occlude(tracker, frames, now):
+    for _ in range(frames):
+        assert step(tracker, EMPTY, now) == []
+
+
+def test_reappearing_object_keeps_cooldown_after_track_is_dropped():
+    tracker = IoUTracker(max_missed=MAX_MISSED)
+    first = step(tracker, GUN, now=0.0)
+    assert len(first) == 1
+
+    occlude(tracker, MAX_MISSED + 2, now=1.0)
+    assert tracker.tracks == []
+
+    # Track nuevo en la misma zona: sigue dentro del cooldown del anterior
+    assert step(tracker, GUN, now=2.0) == []
+    assert tracker.tracks[0].id != first[0].id
+    assert step(tracker, GUN, now=COOLDOWN + 1) == [tracker.tracks[0]]
+
+
+def test_other_object_is_not_silenced_and_expired_cooldowns_are_dropped():
+    tracker = IoUTracker(max_missed=MAX_MISSED)
+    assert len(step(tracker, GUN, now=0.0)) == 1
+    occlude(tracker, MAX_MISSED + 2, now=1.0)
+
+    # Otra arma en otra parte del cuadro alerta por su cuenta
+    elsewhere = GUN.copy()
+    elsewhere[0, [0, 2]] += 400
+    assert len(step(tracker, elsewhere, now=2.0)) == 1
+
+    # Cuando vence el cooldown del track olvidado, deja de recordarse
+    step(tracker, elsewhere, now=COOLDOWN + 1)
+    assert tracker.alerted == []
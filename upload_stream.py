@@ -0,0 +1,201 @@
+"""Recepción de videos en streaming: multipart → disco por chunks, con límite de tamaño y checksum."""
+
+import hashlib
+import os
+import threading
+import uuid
+from typing import Callable, Optional
+
+from python_multipart.multipart import MultipartParser, parse_options_header
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import ClientDisconnect, Request
+
+# Tamaño máximo aceptado por upload (MB)
+MAX_UPLOAD_MB = int(os.getenv("MAX_UPLOAD_MB", "2048"))
+
+# Bytes escritos a partir de los cuales se arranca el procesamiento (MB)
+UPLOAD_START_MB = float(os.getenv("UPLOAD_START_MB", "4"))
+
+ALLOWED_VIDEO_EXTENSIONS = {"mp4", "mov", "avi", "mkv", "webm", "m4v", "mpg", "mpeg"}
+ALLOWED_CONTENT_TYPES = {"application/octet-stream"}  # además de video/*
+
+
+class UploadError(Exception):
+    """Upload rechazado; status_code es el código HTTP a devolver."""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+class VideoUpload:
+    """
+    Estado de un video que se está escribiendo en disco. `done` se activa
+    cuando el archivo ya no crece (terminó bien o se abortó); `failed`
+    indica que el upload se rechazó a mitad de camino.
+    """
+
+    def __init__(self, path: str, saved_name: str, original_filename: str):
+        self.path = path
+        self.saved_name = saved_name
+        self.original_filename = original_filename
+        self.size = 0
+        self.sha256 = hashlib.sha256()
+        self.done = threading.Event()
+        self.failed = False
+
+
+class _VideoPartReceiver:
+    """Callbacks de MultipartParser: guarda el campo `file` y descarta el resto."""
+
+    def __init__(self, dest_dir: str, field_name: str, max_bytes: int):
+        self.dest_dir = dest_dir
+        self.field_name = field_name
+        self.max_bytes = max_bytes
+        self.upload: Optional[VideoUpload] = None
+        self.error: Optional[UploadError] = None
+        self._file = None
+        self._pending = []
+        self._header_field = b""
+        self._header_value = b""
+        self._headers = {}
+        self._in_file_part = False
+
+    def callbacks(self):
+        return {
+            "on_part_begin": self._on_part_begin,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+        }
+
+    def _on_part_begin(self):
+        self._headers = {}
+        self._in_file_part = False
+
+    def _on_header_field(self, data, start, end):
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data, start, end):
+        self._header_value += data[start:end]
+
+    def _on_header_end(self):
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = b""
+        self._header_value = b""
+
+    def _on_headers_finished(self):
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        if options.get(b"name", b"").decode() != self.field_name or self.upload is not None:
+            return
+
+        filename = options.get(b"filename", b"").decode("utf-8", "replace")
+        ext = filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
+        content_type = self._headers.get(b"content-type", b"").decode().lower()
+
+        if ext not in ALLOWED_VIDEO_EXTENSIONS:
+            self.error = UploadError(415, f"Extensión no soportada: .{ext}")
+            return
+        if not (content_type.startswith("video/") or content_type in ALLOWED_CONTENT_TYPES):
+            self.error = UploadError(415, f"Content-Type no soportado: {content_type or 'vacío'}")
+            return
+
+        saved_name = f"{uuid.uuid4()}.{ext}"
+        path = os.path.join(self.dest_dir, saved_name)
+        self.upload = VideoUpload(path, saved_name, filename)
+        self._file = open(path, "wb")
+        self._in_file_part = True
+
+    def _on_part_data(self, data, start, end):
+        if not self._in_file_part or self.error is not None:
+            return
+        chunk = data[start:end]
+        self.upload.size += len(chunk)
+        if self.upload.size > self.max_bytes:
+            self.error = UploadError(413, f"El archivo supera el máximo de {self.max_bytes // (1024 * 1024)} MB")
+            return
+        self.upload.sha256.update(chunk)
+        self._pending.append(chunk)
+
+    def _on_part_end(self):
+        self._in_file_part = False
+
+    def flush(self):
+        """Escribe a disco lo acumulado desde el último chunk de red."""
+        if self._file is not None and self._pending:
+            self._file.write(b"".join(self._pending))
+            self._file.flush()
+        self._pending = []
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+async def receive_video_upload(
+    request: Request,
+    dest_dir: str,
+    on_prefix: Optional[Callable[[VideoUpload], None]] = None,
+    field_name: str = "file",
+    max_bytes: int = MAX_UPLOAD_MB * 1024 * 1024,
+    start_bytes: int = int(UPLOAD_START_MB * 1024 * 1024),
+) -> VideoUpload:
+    """
+    Lee el body multipart por chunks y va escribiendo el campo de video a
+    disco sin cargarlo entero en memoria, calculando el SHA-256 al vuelo.
+    Cuando hay start_bytes escritos (o termina antes) llama a on_prefix una
+    vez, para que el procesamiento arranque mientras el upload continúa.
+
+    Lanza UploadError (413/415/400, o la que lance on_prefix) y borra el
+    archivo parcial si el upload se rechaza; upload.done siempre queda activado.
+    """
+    _, params = parse_options_header(request.headers.get("content-type", ""))
+    boundary = params.get(b"boundary")
+    if not boundary:
+        raise UploadError(400, "Se esperaba multipart/form-data")
+
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > max_bytes + 64 * 1024:
+        raise UploadError(413, f"El archivo supera el máximo de {max_bytes // (1024 * 1024)} MB")
+
+    receiver = _VideoPartReceiver(dest_dir, field_name, max_bytes)
+    parser = MultipartParser(boundary, receiver.callbacks())
+    started = False
+    completed = False
+
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            if receiver.error is not None:
+                raise receiver.error
+            await run_in_threadpool(receiver.flush)
+
+            upload = receiver.upload
+            if upload and not started and on_prefix and upload.size >= start_bytes:
+                started = True
+                on_prefix(upload)
+
+        parser.finalize()
+        if receiver.upload is None:
+            raise UploadError(400, f"Falta el campo '{field_name}' con el video")
+        if on_prefix and not started:
+            on_prefix(receiver.upload)
+        completed = True
+    except ClientDisconnect:
+        raise UploadError(400, "El cliente cortó la conexión durante el upload")
+    finally:
+        await run_in_threadpool(receiver.close)
+        upload = receiver.upload
+        if upload is not None:
+            if not completed:
+                upload.failed = True
+                if os.path.exists(upload.path):
+                    os.remove(upload.path)
+            upload.done.set()
+
+    return receiver.upload